@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+"""
+This module is the library API of the build, for use in-process rather than
+through the scripts. Pages are taken from any iterator of ``(page_name, html)``
+tuples, such as :func:`iter_pages`, and the cleaned pages and search index
+entries are yielded lazily, so that nothing is written to disk and only a few
+pages are held in memory at once.
+
+For example, to index the SDK reference straight from its sources::
+
+    from api import index_pages, iter_pages
+    for name, entry_type, path in index_pages(iter_pages('resources/2017/cpp_ref')):
+        ...
+"""
+import os
+from build_docset import process_page
+from class_graph import ClassGraph
+from database import DatabaseWriter, clean_database
+from doxygen import get_base_pages
+from html_optimiser import optimise_page
+from lib import run_pipeline
+
+
+def iter_pages(docs_sources):
+    """
+    Yields the HTML pages of the directory given, reading each one only when
+    it is needed.
+
+    :param docs_sources: ``str`` path to the directory of the pages, e.g. the
+        ``cpp_ref`` documentation sources.
+
+    :return: generator yielding a ``tuple`` of the name and the ``str`` contents
+        of each page.
+    """
+    if not os.path.isdir(docs_sources):
+        raise IOError('The documentation directory: {0} does not exist!'.format(docs_sources))
+    for entry in os.scandir(docs_sources):
+        if entry.is_file() and os.path.splitext(entry.name)[-1] == '.html':
+            with open(entry.path) as f:
+                yield entry.name, f.read()
+
+
+def _process_contents(name, html, max_version, engine, clean, index, optimise):
+    """Processes a single page given its contents. This is run by the workers."""
+    formatted = [] if clean else None
+    records = []
+    entries = process_page(name,
+                           None,
+                           max_version=max_version,
+                           index=index,
+                           engine=engine,
+                           records=records,
+                           formatted=formatted,
+                           page=html)
+    html = formatted[0] if formatted else None
+    shared = {}
+    if html is not None and optimise:
+        html, shared = optimise_page(html)
+    return html, entries, get_base_pages(records), shared
+
+
+def _process_pages(pages, max_version, engine, clean, index, optimise, jobs, pool):
+    """
+    Yields the results of :func:`_process_contents` for each page, processed
+    on the pipeline of :func:`lib.run_pipeline`. Each page is only taken from
+    ``pages`` once there is room for it in the pipeline.
+    """
+    contents = {}
+
+    def names():
+        for name, html in pages:
+            contents[name] = html
+            yield name
+
+    for name, result, error in run_pipeline(_process_contents,
+                                            names(),
+                                            contents.pop,
+                                            None,
+                                            (max_version, engine, clean, index, optimise),
+                                            jobs,
+                                            pool):
+        if error:
+            raise IOError('Failed to process: {0}!\n{1}'.format(name, error))
+        yield (name,) + result
+
+
+def process_pages(pages, max_version='2017', engine='stream', optimise=False, jobs=1, pool=None):
+    """
+    Cleans and indexes the pages given in a single pass, parsing each page once.
+
+    :param pages: iterator of ``(page_name, html)`` tuples of the original
+        documentation pages, e.g. from :func:`iter_pages`.
+
+    :param max_version: ``str`` indicating what version of 3ds max the pages are from.
+
+    :param engine: ``str`` name of the engine used to process the pages; either
+        ``stream`` or ``soup``.
+
+    :param optimise: ``bool`` to indicate if the size of the cleaned pages should
+        be optimised, like ``clean_html_documentation.py --optimise`` does. The
+        shared files the optimised pages load are yielded like pages, with no
+        entries, before the first page that loads them.
+
+    :param jobs: ``int`` number of worker processes to use. If ``1``, the pages
+        are processed in the current process.
+
+    :param pool: ``multiprocessing.Pool`` to process the pages on instead.
+
+    :return: generator yielding a ``tuple`` of the name of each page, the ``str``
+        cleaned page and the ``list`` of its ``(name, type, path)`` entries, in
+        order of completion.
+    """
+    written = set()
+    for name, html, entries, _, shared in _process_pages(pages, max_version, engine, True, True, optimise, jobs, pool):
+        for relative_path, contents in sorted(shared.items()):
+            if relative_path not in written:
+                written.add(relative_path)
+                yield relative_path, contents, []
+        yield name, html, entries
+
+
+def clean_pages(pages, max_version='2017', engine='stream', optimise=False, jobs=1, pool=None):
+    """
+    Cleans the pages given, like ``clean_html_documentation.py``.
+
+    See :func:`process_pages` for the parameters.
+
+    :return: generator yielding a ``tuple`` of the name of each page and the
+        ``str`` cleaned page.
+    """
+    written = set()
+    for name, html, _, _, shared in _process_pages(pages, max_version, engine, True, False, optimise, jobs, pool):
+        for relative_path, contents in sorted(shared.items()):
+            if relative_path not in written:
+                written.add(relative_path)
+                yield relative_path, contents
+        yield name, html
+
+
+def index_pages(pages, max_version='2017', engine='stream', cleaned=False, inherited_members=False, jobs=1, pool=None):
+    """
+    Extracts the search index entries of the pages given, like
+    ``generate_database_entries.py``.
+
+    See :func:`process_pages` for the other parameters.
+
+    :param cleaned: ``bool`` to indicate if the pages have already been cleaned.
+        Otherwise the links of the original pages are rewritten first, so that
+        the entries point to the cleaned pages.
+
+    :param inherited_members: ``bool`` to indicate if the members each class
+        inherits should be indexed under the name of the class too. These
+        entries are yielded once every page has been processed.
+
+    :return: generator yielding a ``(name, type, path)`` tuple for each entry.
+    """
+    graph = ClassGraph()
+    for name, _, entries, bases, _ in _process_pages(pages, max_version, engine, not cleaned, True, False, jobs, pool):
+        if inherited_members and entries and entries[0][1] == 'Class':
+            graph.add_class(name, entries, bases)
+        for entry in entries:
+            yield entry
+    for entries in graph.get_inherited_entries().values():
+        for entry in entries:
+            yield entry
+
+
+def write_database(entries, database_file_path):
+    """
+    Writes the search index entries given to a new docset database.
+
+    :param entries: iterator of ``(name, type, path)`` tuples, e.g. from
+        :func:`index_pages`.
+
+    :param database_file_path: ``str`` path to the docset database. Any existing
+        search index in it is replaced.
+
+    :return: ``int`` number of entries given. Duplicate entries are only written once.
+    """
+    clean_database(database_file_path)
+    num_entries = 0
+    with DatabaseWriter(database_file_path, rebuild=True) as writer:
+        for entry in entries:
+            writer.insert([entry])
+            num_entries += 1
+    return num_entries
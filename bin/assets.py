@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+"""
+This module mirrors the assets of the documentation (the CSS styles, the
+scripts and every non-HTML file such as images) to the docset. Assets are
+either copied, hard linked or cloned (reflinked) on filesystems that support
+it, on a pool of threads, and assets whose size and modification time already
+match at the destination are skipped, so that a rebuild copies next to nothing.
+"""
+import errno
+import filecmp
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from stat import S_ISREG
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+ASSET_MODES = ('copy', 'hardlink', 'reflink')
+# NOTE: The ``FICLONE`` ioctl from ``linux/fs.h``, which clones a file on Btrfs, XFS etc.
+FICLONE = 0x40049409
+# NOTE: The errors raised when a file cannot be linked or cloned to its destination,
+# in which case it is copied instead.
+FALLBACK_ERRNOS = frozenset([errno.EXDEV, errno.EPERM, errno.EACCES, errno.EINVAL,
+                             errno.ENOTTY, errno.EOPNOTSUPP, errno.EMLINK, errno.ENOSYS])
+
+
+def list_assets(docs_sources, catalogue=None):
+    """
+    Returns the assets of the documentation sources given.
+
+    :param docs_sources: ``str`` path to the ``cpp_ref`` documentation sources.
+        The ``style`` and ``scripts`` directories are expected next to it.
+
+    :param catalogue: :class:`catalogue.Catalogue` of ``docs_sources``, whose
+        assets are used instead of listing the directory again.
+
+    :return: ``list`` of ``(source_path, relative_path)`` tuples, where
+        ``relative_path`` is the path of the asset in the output directory.
+    """
+    styles_path = os.path.join(os.path.dirname(docs_sources), 'style')
+    if not os.path.isdir(styles_path):
+        raise IOError('The CSS styles directory: {0} does not exist!'.format(styles_path))
+    scripts_path = os.path.join(os.path.dirname(docs_sources), 'scripts')
+    if not os.path.isdir(scripts_path):
+        raise IOError('The JScript directory: {0} does not exist!'.format(scripts_path))
+
+    assets = [(os.path.join(styles_path, f), f) for f in os.listdir(styles_path)]
+    for root, _, filenames in os.walk(scripts_path):
+        relative_root = os.path.join('scripts', os.path.relpath(root, scripts_path))
+        assets.extend([(os.path.join(root, f), os.path.normpath(os.path.join(relative_root, f)))
+                       for f in filenames])
+    # NOTE: Just copy the rest over anyway, since those files are needed (CSS, scripts etc.)
+    if catalogue is not None:
+        assets.extend((os.path.join(docs_sources, f), f) for f in catalogue.assets)
+        return assets
+    for entry in os.scandir(docs_sources):
+        if entry.is_file() and os.path.splitext(entry.name)[-1] != '.html':
+            assets.append((entry.path, entry.name))
+    return assets
+
+
+def is_up_to_date(source_path, destination_path, store=None):
+    """
+    Returns ``True`` if the destination has the same size and modification time
+    as the source.
+
+    Hard linked destinations (e.g. to the copy shared by the docsets of several
+    versions) keep the modification time of whichever file was linked first, so
+    they are checked against the record of the ``store`` they are linked to
+    instead, and their contents are only compared if there is none.
+
+    :param store: :class:`store.ContentStore` the destination may be linked to.
+    """
+    try:
+        destination_stat = os.stat(destination_path)
+    except OSError:
+        return False
+    source_stat = os.stat(source_path)
+    if not S_ISREG(destination_stat.st_mode) or destination_stat.st_size != source_stat.st_size:
+        return False
+    if destination_stat.st_mtime_ns == source_stat.st_mtime_ns:
+        return True
+    if destination_stat.st_nlink <= 1:
+        return False
+    if store is not None and store.is_linked_copy(destination_path, source_path):
+        return True
+    return filecmp.cmp(source_path, destination_path, shallow=False)
+
+
+def reflink(source_path, destination_path):
+    """Clones the source file to the destination, sharing its blocks until either is modified."""
+    if fcntl is None:
+        raise OSError(errno.ENOSYS, 'Cloning files is not supported on this platform.')
+    with open(source_path, 'rb') as source, open(destination_path, 'wb') as destination:
+        try:
+            fcntl.ioctl(destination.fileno(), FICLONE, source.fileno())
+        except OSError:
+            destination.close()
+            os.remove(destination_path)
+            raise
+    shutil.copystat(source_path, destination_path)
+
+
+def mirror_asset(source_path, destination_path, mode='copy', store=None):
+    """
+    Mirrors a single asset to its destination, unless it is already up to date.
+
+    :param mode: ``str`` either ``copy``, ``hardlink`` or ``reflink``. If the
+        asset cannot be linked or cloned, it is copied instead.
+
+    :param store: :class:`store.ContentStore` the destination is linked to once
+        it has been mirrored, which records its source.
+
+    :return: ``str`` how the asset was mirrored; either ``skipped`` or the mode used.
+    """
+    if is_up_to_date(source_path, destination_path, store):
+        if store is not None:
+            store.set_source(destination_path, source_path)
+        return 'skipped'
+    if store is not None:
+        store.set_source(destination_path, source_path)
+    # NOTE: The destination is always removed first, so that a previous hard link
+    # is never written through to the source.
+    if os.path.lexists(destination_path):
+        os.remove(destination_path)
+    if mode != 'copy':
+        try:
+            if mode == 'hardlink':
+                os.link(source_path, destination_path)
+            else:
+                reflink(source_path, destination_path)
+            return mode
+        except OSError as e:
+            if e.errno not in FALLBACK_ERRNOS:
+                raise
+    shutil.copy2(source_path, destination_path)
+    return 'copy'
+
+
+def prune_outputs(output_path, expected, keep=()):
+    """
+    Deletes the files in the output directory that are not expected, and any
+    directory left empty, so that the output mirrors the sources.
+
+    :param expected: ``set`` of the paths of the expected files, relative to
+        ``output_path``.
+
+    :param keep: ``tuple`` of the paths of directories, relative to ``output_path``,
+        whose files are kept even though they do not come from the sources.
+
+    :return: ``int`` number of files deleted.
+    """
+    num_removed = 0
+    for root, _, filenames in os.walk(output_path, topdown=False):
+        for f in filenames:
+            path = os.path.join(root, f)
+            relative_path = os.path.relpath(path, output_path)
+            if relative_path not in expected and relative_path.split(os.sep)[0] not in keep:
+                os.remove(path)
+                num_removed += 1
+        if root != output_path and not os.listdir(root):
+            os.rmdir(root)
+    return num_removed
+
+
+def sync_assets(docs_sources, output_path, mode='copy', threads=None, keep=(), catalogue=None, store=None):
+    """
+    Mirrors the assets of the documentation sources to the output directory,
+    and deletes any file in it that does not come from the sources.
+
+    :param docs_sources: ``str`` path to the ``cpp_ref`` documentation sources.
+
+    :param output_path: ``str`` path to the directory of the formatted documentation.
+
+    :param mode: ``str`` either ``copy``, ``hardlink`` or ``reflink``.
+
+    :param threads: ``int`` number of threads copying the assets. Defaults to
+        the default of :class:`concurrent.futures.ThreadPoolExecutor`.
+
+    :param keep: ``tuple`` of the names of the directories in ``output_path``
+        that are not removed even though they do not come from the sources.
+
+    :param catalogue: :class:`catalogue.Catalogue` of ``docs_sources``, used
+        instead of listing the directory again.
+
+    :param store: :class:`store.ContentStore` the output directory is linked
+        to, used to skip the assets linked to it without reading them.
+
+    :return: ``dict`` of the number of assets mirrored with each mode, the number
+        skipped and the number of stale files removed.
+    """
+    logger = logging.getLogger(__name__)
+    if mode not in ASSET_MODES:
+        raise ValueError('Unknown asset mode: {0}!'.format(mode))
+    start = time.time()
+    assets = list_assets(docs_sources, catalogue)
+    expected = set(relative_path for _, relative_path in assets)
+    if catalogue is not None:
+        expected.update(catalogue.pages)
+    else:
+        expected.update(f for f in os.listdir(docs_sources) if os.path.splitext(f)[-1] == '.html')
+    stats = dict((m, 0) for m in ASSET_MODES + ('skipped',))
+    stats['removed'] = prune_outputs(output_path, expected, keep)
+
+    for directory in set(os.path.dirname(relative_path) for _, relative_path in assets):
+        if directory and not os.path.isdir(os.path.join(output_path, directory)):
+            os.makedirs(os.path.join(output_path, directory))
+    with ThreadPoolExecutor(threads) as pool:
+        for result in pool.map(lambda asset: mirror_asset(asset[0], os.path.join(output_path, asset[1]), mode, store),
+                               assets):
+            stats[result] += 1
+
+    logger.info('Synced {0} assets in {1:.2f}s: {2} skipped, {3} copied, {4} hard linked, {5} reflinked, {6} stale files removed.'.format(
+        len(assets), time.time() - start, stats['skipped'], stats['copy'], stats['hardlink'], stats['reflink'], stats['removed']))
+    return stats
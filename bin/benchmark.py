@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+"""
+This module is a script that benchmarks the build against a synthetic copy of
+the documentation generated by :mod:`generate_corpus` (or against a real copy,
+if one is given). Each stage is run both serially and in parallel, each in its
+own process so that its peak memory usage can be measured, and the results are
+reported as JSON so that they can be tracked for regressions.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import build_docset
+import clean_html_documentation
+import generate_corpus
+import generate_database_entries
+import search_index
+from metrics import get_metrics_path
+
+
+# NOTE: Each scenario is the stage to run, whether it runs in parallel, whether
+# it is a full rebuild and the scenario whose output it runs against, if any.
+SCENARIOS = [
+    ('format-serial', 'format', False, True, None),
+    ('format-parallel', 'format', True, True, None),
+    ('index-serial', 'index', False, True, 'format-serial'),
+    ('index-parallel', 'index', True, True, 'format-serial'),
+    ('build-serial', 'build', False, True, None),
+    ('build-parallel', 'build', True, True, None),
+    ('build-noop', 'build', True, False, 'build-parallel'),
+    ('query', 'query', False, True, 'build-parallel'),
+]
+# NOTE: The number of lookups of each kind measured by the ``query`` scenario.
+NUM_QUERIES = 2000
+
+
+def get_peak_rss():
+    """
+    Returns the peak resident set size of this process and of all of its
+    children that have been waited for, in kilobytes.
+    """
+    scale = 1024 if sys.platform == 'darwin' else 1
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) // scale
+
+
+def count_rows(database_file_path):
+    """Returns the number of entries in the search index of the database given."""
+    if not os.path.isfile(database_file_path):
+        return 0
+    conn = sqlite3.connect(database_file_path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM searchIndex;').fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0
+    finally:
+        conn.close()
+
+
+def run_scenario(stage, docs_sources, output_path, multi_thread, full, jobs, max_version, engine):
+    """
+    Runs a single stage of the build and measures it. This is run in its own
+    process by :func:`main`.
+
+    :return: ``dict`` of the measurements.
+    """
+    documents_path = os.path.join(output_path, 'Documents')
+    database_file_path = os.path.join(output_path, 'docSet.dsidx')
+    if not os.path.isdir(output_path):
+        os.makedirs(output_path)
+    start = time.time()
+    lookups = None
+    metrics_path = None
+    if stage == 'query':
+        # NOTE: The search tables are built on the database of the docset given,
+        # and the time taken to build them is reported as the wall time.
+        search_index.build_search_tables(database_file_path, documents_path)
+        exit_code = 0
+    elif stage == 'format':
+        metrics_path = get_metrics_path(documents_path, stage)
+        exit_code = clean_html_documentation.main(docs_sources, documents_path, multi_thread,
+                                                  max_version, full, jobs, engine, metrics_path)
+    elif stage == 'index':
+        metrics_path = get_metrics_path(database_file_path, stage)
+        exit_code = generate_database_entries.main(docs_sources, database_file_path, max_version,
+                                                   multi_thread, full, jobs, engine, metrics_path)
+    else:
+        metrics_path = get_metrics_path(database_file_path, stage)
+        exit_code = build_docset.main(docs_sources, documents_path, database_file_path, max_version,
+                                      multi_thread, full, jobs, engine, metrics_path)
+    wall_time = time.time() - start
+    if stage == 'query':
+        lookups = search_index.benchmark_lookups(database_file_path, NUM_QUERIES)
+
+    # NOTE: The rates are of the pages the run actually processed, and the rows
+    # extracted from them, as recorded in its metrics; an incremental run that
+    # has nothing to do processes no pages. The ``query`` scenario processes no
+    # pages at all, so it has no rates.
+    pages = None
+    rows = None
+    if metrics_path:
+        with open(metrics_path) as f:
+            summary = json.load(f)
+        pages = summary['pages']
+        rows = summary['entries']
+    return {'exitCode': exit_code,
+            'wallTime': round(wall_time, 4),
+            'pages': pages,
+            'pagesPerSec': round(pages / wall_time, 2) if pages is not None and wall_time else None,
+            'rows': rows,
+            'rowsPerSec': round(rows / wall_time, 2) if rows is not None and wall_time else None,
+            'databaseRows': count_rows(database_file_path) if stage != 'format' else 0,
+            'peakRssKb': get_peak_rss(),
+            'lookups': lookups}
+
+
+def main(docs_sources=None,
+         work_path=None,
+         num_pages=1000,
+         size_scale=1.0,
+         jobs=None,
+         max_version='2017',
+         engine='stream',
+         scenarios=None):
+    """
+    This is the main entry point of the program.
+
+    :param docs_sources: ``str`` path to the ``cpp_ref`` documentation to benchmark
+        against. If ``None``, a synthetic copy is generated.
+
+    :param work_path: ``str`` path to the directory to write the outputs to. If
+        ``None``, a temporary directory is used and removed afterwards.
+
+    :param num_pages: ``int`` number of pages of the synthetic documentation.
+
+    :param size_scale: ``float`` factor applied to the size of the synthetic class pages.
+
+    :param jobs: ``int`` number of worker processes used by the parallel scenarios.
+
+    :param max_version: ``str`` indicating what version of 3ds max the documentation is for.
+
+    :param engine: ``str`` name of the engine used to process the pages.
+
+    :param scenarios: ``list`` of the names of the scenarios to run. If ``None``,
+        all scenarios are run.
+
+    :return: ``dict`` of the benchmark results.
+    """
+    logger = logging.getLogger(__name__)
+    temporary = work_path is None
+    work_path = work_path or tempfile.mkdtemp(prefix='docset_benchmark_')
+    jobs = jobs or multiprocessing.cpu_count()
+    try:
+        if docs_sources:
+            corpus = {'path': os.path.abspath(docs_sources)}
+        else:
+            corpus = generate_corpus.main(os.path.join(work_path, 'resources', max_version),
+                                          num_pages,
+                                          size_scale)
+            docs_sources = corpus['path']
+
+        results = []
+        for name, stage, multi_thread, full, source_scenario in SCENARIOS:
+            if scenarios and name not in scenarios:
+                continue
+            output_path = os.path.join(work_path, name)
+            sources = docs_sources
+            if stage == 'index':
+                sources = os.path.join(work_path, source_scenario, 'Documents')
+            elif source_scenario:
+                output_path = os.path.join(work_path, source_scenario)
+            if not os.path.isdir(sources):
+                logger.warning('Skipping scenario: {0}, {1} was not run!'.format(name, source_scenario))
+                continue
+            logger.info('Running scenario: {0}...'.format(name))
+            # NOTE: Each scenario runs in a new process so that its peak memory
+            # usage is not hidden by that of the scenarios before it.
+            output = subprocess.check_output([sys.executable,
+                                              os.path.abspath(__file__),
+                                              '--scenario', stage,
+                                              '--sources', sources,
+                                              '--output', output_path,
+                                              '--jobs', str(jobs if multi_thread else 1),
+                                              '--maxVersion', max_version,
+                                              '--engine', engine]
+                                             + (['--multiThread'] if multi_thread else [])
+                                             + ([] if full else ['--incremental']))
+            result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+            result['scenario'] = name
+            results.append(result)
+            logger.info('{0}: {1:.2f}s, {2} pages/s, {3} rows/s, {4} KB peak RSS'.format(
+                name, result['wallTime'], result['pagesPerSec'], result['rowsPerSec'], result['peakRssKb']))
+            if result['lookups']:
+                logger.info('{0}: prefix lookups p50 {1}ms p99 {2}ms, full-text lookups p50 {3}ms p99 {4}ms'.format(
+                    name, result['lookups']['prefix']['p50Ms'], result['lookups']['prefix']['p99Ms'],
+                    result['lookups']['text']['p50Ms'], result['lookups']['text']['p99Ms']))
+    finally:
+        if temporary:
+            shutil.rmtree(work_path, ignore_errors=True)
+
+    return {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': multiprocessing.cpu_count(),
+            'jobs': jobs,
+            'engine': engine,
+            'corpus': corpus,
+            'results': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='This program benchmarks the docset build.')
+    parser.add_argument('-s',
+                        '--sources',
+                        type=str,
+                        help='The directory on disk where the documentation to benchmark against is located. If not given, a synthetic copy is generated.')
+    parser.add_argument('-w',
+                        '--workDir',
+                        type=str,
+                        help='The directory on disk where the outputs should be written to. Defaults to a temporary directory.')
+    parser.add_argument('-o',
+                        '--output',
+                        type=str,
+                        help='The path to write the JSON results to. Defaults to standard output.')
+    parser.add_argument('-n',
+                        '--pages',
+                        type=int,
+                        default=1000,
+                        help='The number of pages of the synthetic documentation.')
+    parser.add_argument('-ss',
+                        '--sizeScale',
+                        type=float,
+                        default=1.0,
+                        help='The factor applied to the size of the synthetic class pages.')
+    parser.add_argument('-j',
+                        '--jobs',
+                        type=int,
+                        help='The number of jobs used by the parallel scenarios. Defaults to the number of cores.')
+    parser.add_argument('-mv',
+                        '--maxVersion',
+                        type=str,
+                        default='2017',
+                        help='The 3ds max version of the documentation.')
+    parser.add_argument('-e',
+                        '--engine',
+                        choices=build_docset.ENGINES,
+                        default='stream',
+                        help='The engine used to process the pages.')
+    parser.add_argument('--only',
+                        nargs='+',
+                        choices=[s[0] for s in SCENARIOS],
+                        help='The scenarios to run. Defaults to all of them.')
+    # NOTE: The flags below are used internally to run a single scenario.
+    parser.add_argument('--scenario', choices=['format', 'index', 'build', 'query'], help=argparse.SUPPRESS)
+    parser.add_argument('--multiThread', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--incremental', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        logging.basicConfig(level=logging.WARNING)
+        print(json.dumps(run_scenario(args.scenario,
+                                      args.sources,
+                                      args.output,
+                                      args.multiThread,
+                                      not args.incremental,
+                                      args.jobs,
+                                      args.maxVersion,
+                                      args.engine)))
+        sys.exit(0)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    results = main(args.sources,
+                   args.workDir,
+                   args.pages,
+                   args.sizeScale,
+                   args.jobs,
+                   args.maxVersion,
+                   args.engine,
+                   args.only)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,544 @@
+#!/usr/bin/env python
+"""
+This module is a script that builds the docset in a single pass. Each page of
+the 3ds max Doxygen documentation is parsed only once, and both the formatted
+HTML and the search index entries for the page are produced from that parse.
+"""
+import argparse
+import functools
+import io
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from assets import ASSET_MODES, sync_assets
+from bs4 import BeautifulSoup, Comment
+from catalogue import get_catalogue_path, scan_catalogue
+from class_graph import update_inherited_entries
+from database import DatabaseWriter, clean_database, has_search_index
+from doxygen import LINK_ATTRIBUTES, get_anchor_name, get_base_pages, get_member_entries_from_records, get_page_entry, rewrite_link
+from html_optimiser import SHARED_DIRECTORY, optimise_page, prune_shared_files, write_shared_files
+from html_rewriter import PageRewriter
+from lib import get_database_path, get_documents_path, get_sources_path, run_pipeline, sort_by_size
+from manifest import Manifest, get_manifest_path
+from metrics import BuildMetrics, Stopwatch, get_metrics_path
+from search_index import build_search_tables, drop_search_tables, has_search_text
+
+
+ENGINES = ('stream', 'soup')
+
+
+def format_soup(soup, logger):
+    """
+    This function rewrites the links of the parsed page given so that they work
+    standalone, and inserts the anchors needed for the table of contents.
+    """
+    for tag in soup.find_all(list(LINK_ATTRIBUTES)):
+        url = tag.get(LINK_ATTRIBUTES[tag.name])
+        if url:
+            tag[LINK_ATTRIBUTES[tag.name]] = rewrite_link(tag.name, url)
+
+    # Also insert anchors in order for table of contents to work
+    for td in soup.find_all('td'):
+        if td.get('class') and 'memname' in td.get('class') and td.a:
+            # NOTE: Comments are not part of the name of the member.
+            contents = [c for c in td.contents if not isinstance(c, Comment)]
+            anchor_name = get_anchor_name(contents[-1], logger)
+            if anchor_name:
+                new_tag = soup.new_tag('a')
+                new_tag['name'] = anchor_name
+                new_tag['class'] = 'dashAnchor'
+                td.insert(0, new_tag)
+
+
+def get_member_records(soup):
+    """
+    Returns the records of the members listed in each section of the parsed
+    class page given.
+
+    :param soup: ``BeautifulSoup`` of the class page.
+
+    :return: ``list`` of ``(section, row_classes, link_classes, url, name)`` tuples.
+    """
+    records = []
+    for h2 in soup.find_all('h2', {'class': 'groupheader'}):
+        if not h2.a or not h2.a.get('name'):
+            continue
+        items = h2.parent.parent.parent.find_all(
+            'td',
+            {'class' : 'memItemRight'}
+        )
+        for item in items:
+            if not item.a:
+                continue
+            records.append((h2.a.get('name'),
+                            item.parent.get('class') or [],
+                            item.a.get('class') or [],
+                            item.a.get('href'),
+                            item.a.string and str(item.a.string)))
+    return records
+
+
+def get_member_entries(soup, class_name, max_version='2017'):
+    """
+    Returns the search index entries for the types and methods declared in the
+    parsed class page given.
+
+    :param soup: ``BeautifulSoup`` of the class page.
+
+    :param class_name: ``str`` name of the class the page documents.
+
+    :param max_version: ``str`` indicating what version of 3ds max the page is from.
+
+    :return: ``list`` of ``(name, type, path)`` tuples.
+    """
+    return get_member_entries_from_records(get_member_records(soup), class_name, max_version)
+
+
+def process_page(filename, docs_sources, output_path=None, max_version='2017', index=True, engine='stream', optimise=False, logger=None, metrics=None, records=None, formatted=None, page=None, page_entry=None):
+    """
+    This function processes a single documentation page, parsing it at most once.
+
+    :param filename: ``str`` name of the page in ``docs_sources``.
+
+    :param docs_sources: ``str`` path to the directory containing the page.
+
+    :param output_path: ``str`` path to write the formatted page to. If ``None``,
+        the page is not formatted.
+
+    :param max_version: ``str`` indicating what version of 3ds max the page is from.
+
+    :param index: ``bool`` to indicate if search index entries should be extracted.
+
+    :param engine: ``str`` name of the engine used to process the page; either
+        ``stream`` for the streaming rewriter or ``soup`` for BeautifulSoup.
+
+    :param optimise: ``bool`` to indicate if the size of the formatted page should
+        be optimised. Its larger inline scripts and styles are written to shared
+        files in ``output_path``.
+
+    :param metrics: ``dict`` to record the size of the page and the time spent
+        in each stage of processing it into.
+
+    :param records: ``list`` to add the records of the members of the class
+        the page documents to, if it is a class page.
+
+    :param formatted: ``list`` to add the formatted page to, instead of writing
+        it to ``output_path``.
+
+    :param page: ``str`` contents of the page, if it has already been read.
+
+    :param page_entry: ``tuple`` search index entry of the page, if it has
+        already been looked up, e.g. in the :class:`catalogue.Catalogue`.
+
+    :return: ``list`` of ``(name, type, path)`` search index entries for the page.
+    """
+    logger = logger or logging.getLogger(__name__)
+    if os.path.splitext(filename)[-1] != '.html':
+        return []
+    entries = []
+    page_entry = (page_entry or get_page_entry(filename)) if index else None
+    if page_entry:
+        entries.append(page_entry)
+    parse_members = page_entry is not None and page_entry[1] == 'Class'
+    format_page = output_path is not None or formatted is not None
+    if not format_page and not parse_members:
+        return entries
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Processing: {0}...'.format(filename))
+    watch = Stopwatch(metrics)
+    html = page if page is not None else open(os.path.join(docs_sources, filename)).read()
+    watch.lap('read')
+    if engine == 'stream':
+        rewriter = PageRewriter(page_entry[0] if parse_members else None,
+                                max_version,
+                                format_page,
+                                logger).feed(html)
+        member_records = rewriter.records
+        watch.lap('rewrite')
+        if format_page:
+            html = rewriter.getvalue()
+            watch.lap('serialise')
+    else:
+        soup = BeautifulSoup(html, 'html.parser')
+        watch.lap('parse')
+        # NOTE: Members are extracted before the links are rewritten, like the streaming
+        # engine does, so that the records only depend on the contents of the page.
+        member_records = get_member_records(soup) if parse_members else []
+        watch.lap('extract')
+        if format_page:
+            format_soup(soup, logger)
+            watch.lap('rewrite')
+            html = str(soup)
+            watch.lap('serialise')
+    if format_page and optimise:
+        size = len(html.encode('utf-8'))
+        html, shared = optimise_page(html)
+        if output_path is not None:
+            write_shared_files(output_path, shared)
+        if metrics is not None:
+            metrics['formattedBytes'] = size
+            metrics['bytesSaved'] = size - len(html.encode('utf-8'))
+            # NOTE: Popped by the caller, so that the unused shared files can be removed.
+            metrics['shared'] = sorted(shared)
+        watch.lap('optimise')
+    if formatted is not None:
+        formatted.append(html)
+    elif output_path is not None:
+        write_page(output_path, filename, html)
+        watch.lap('write')
+    if parse_members:
+        entries.extend(get_member_entries_from_records(member_records,
+                                                       page_entry[0],
+                                                       max_version,
+                                                       format_page))
+        watch.lap('extract')
+        if records is not None:
+            records.extend(member_records)
+    if metrics is not None and page is None:
+        metrics['bytes'] = os.path.getsize(os.path.join(docs_sources, filename))
+    return entries
+
+
+def write_page(output_path, filename, html):
+    """Writes the formatted page given to the output directory."""
+    # NOTE: The previous output is removed rather than overwritten, in case it
+    # is hard linked to the same page of the docset of another version.
+    if os.path.lexists(os.path.join(output_path, filename)):
+        os.remove(os.path.join(output_path, filename))
+    with open(os.path.join(output_path, filename), 'w') as of:
+        of.write(html)
+
+
+def process_page_timed(filename, *args, **kwargs):
+    """
+    Processes a single page like :func:`process_page`, timing each stage.
+
+    :return: ``tuple`` of the ``list`` of search index entries for the page, the
+        ``list`` of the records of its members and the ``dict`` of its metrics.
+    """
+    metrics = {'pid': os.getpid()}
+    records = []
+    start = time.time()
+    entries = process_page(filename, *args, metrics=metrics, records=records, **kwargs)
+    metrics['total'] = time.time() - start
+    metrics['entries'] = len(entries)
+    return entries, records, metrics
+
+
+def read_page(filename, docs_sources, index_only=False, catalogue=None):
+    """
+    Reads the contents of a page ahead of its processing, on one of the prefetch
+    threads of :func:`lib.run_pipeline`.
+
+    :param index_only: ``bool`` to indicate if the page is only indexed, in which
+        case only class pages are read, since the others are not parsed.
+
+    :param catalogue: :class:`catalogue.Catalogue` of ``docs_sources`` to look up
+        the search index entry of the page in, so that the workers do not decode
+        its name again.
+
+    :return: ``tuple`` of the ``bytes`` contents of the page, or ``None`` if it
+        was not read, the time spent reading it and its search index entry.
+    """
+    page_entry = catalogue.get_page_entry(filename) if catalogue is not None else get_page_entry(filename)
+    if index_only and (page_entry or (None, None))[1] != 'Class':
+        return None, 0.0, page_entry
+    start = time.time()
+    with open(os.path.join(docs_sources, filename), 'rb') as f:
+        data = f.read()
+    return data, time.time() - start, page_entry
+
+
+def process_page_prefetched(filename, prefetched, docs_sources, output_path=None, *args):
+    """
+    Processes a single page like :func:`process_page_timed`, given its contents
+    as read by :func:`read_page`. The formatted page is returned rather than
+    written to ``output_path``, so that it can be written by another thread.
+
+    :return: ``tuple`` of the ``list`` of search index entries for the page, the
+        ``list`` of the records of its members, the ``dict`` of its metrics and
+        the ``str`` formatted page, or ``None`` if ``output_path`` is ``None``.
+    """
+    data, read_time, page_entry = prefetched
+    # NOTE: Decoded like ``open`` would, with the preferred encoding and universal newlines.
+    page = io.TextIOWrapper(io.BytesIO(data)).read() if data is not None else None
+    formatted = [] if output_path is not None else None
+    entries, records, metrics = process_page_timed(filename, docs_sources, output_path, *args,
+                                                   formatted=formatted, page=page, page_entry=page_entry)
+    if data is not None:
+        metrics['bytes'] = len(data)
+        metrics['read'] = metrics.get('read', 0.0) + read_time
+        metrics['total'] += read_time
+    return entries, records, metrics, formatted[0] if formatted else None
+
+
+def write_page_result(filename, result, output_path):
+    """
+    Writes the formatted page returned by :func:`process_page_prefetched` to the
+    output directory, on one of the writer threads of :func:`lib.run_pipeline`.
+
+    :return: ``tuple`` of the ``list`` of search index entries for the page, the
+        ``list`` of the records of its members and the ``dict`` of its metrics.
+    """
+    entries, records, metrics, html = result
+    if html is not None:
+        start = time.time()
+        write_page(output_path, filename, html)
+        metrics['write'] = metrics.get('write', 0.0) + time.time() - start
+        metrics['total'] += time.time() - start
+    return entries, records, metrics
+
+
+def main(docs_sources,
+         output_path,
+         database_file_path,
+         max_version='2017',
+         multi_thread=False,
+         full=False,
+         jobs=None,
+         engine='stream',
+         metrics_path=None,
+         top=10,
+         asset_mode='copy',
+         pool=None,
+         search_tables=False,
+         inherited_members=False,
+         store=None,
+         optimise=False):
+    """
+    This is the main entry point of the program. It formats the HTML sources
+    specified in ``docs_sources``, writes them to the ``output_path`` directory
+    and writes their search index entries to ``database_file_path``.
+
+    Only the files that have changed since the last build are processed, unless
+    ``full`` is set.
+
+    :param docs_sources: ``str`` path to the original documentation sources. This
+        should contain the ``cpp_ref`` folder, among other resources.
+
+    :param output_path: ``str`` path to write the formatted HTML files to.
+
+    :param database_file_path: ``str`` path to write the docset database to.
+
+    :param max_version: ``str`` indicating what version of 3ds max the docset
+        being generated for is.
+
+    :param multi_thread: ``bool`` to indicate if multithreading support should be
+        enabled.
+
+    :param full: ``bool`` to indicate if the docset should be rebuilt from scratch.
+
+    :param jobs: ``int`` number of worker processes to use. Defaults to the
+        number of cores if ``multi_thread`` is enabled.
+
+    :param engine: ``str`` name of the engine used to process the pages; either
+        ``stream`` or ``soup``.
+
+    :param metrics_path: ``str`` path to write the metrics of the build to. Defaults
+        to a file next to the manifest.
+
+    :param top: ``int`` number of the slowest and largest pages to report.
+
+    :param asset_mode: ``str`` how the assets are mirrored to ``output_path``;
+        either ``copy``, ``hardlink`` or ``reflink``.
+
+    :param pool: ``multiprocessing.Pool`` to process the pages on, e.g. one that
+        is shared between the builds of several versions. If ``None``, a pool of
+        ``jobs`` workers is created for this build.
+
+    :param search_tables: ``bool`` to indicate if the prefix index and full-text
+        table used by :mod:`search_index` should be built too.
+
+    :param inherited_members: ``bool`` to indicate if the members each class
+        inherits should be indexed under the name of the class too.
+
+    :param store: :class:`store.ContentStore` that ``output_path`` is linked to
+        after the build, e.g. by :mod:`build_versions`.
+
+    :param optimise: ``bool`` to indicate if the size of the formatted pages should
+        be optimised, like :func:`clean_html_documentation.main` does.
+
+    :return: ``int`` exit code; non-zero if any page failed to be processed.
+    """
+    logger = logging.getLogger(__name__)
+    if not docs_sources:
+        docs_sources = get_sources_path(max_version)
+    if not output_path:
+        output_path = get_documents_path(max_version)
+    if not database_file_path:
+        database_file_path = get_database_path(max_version)
+    if docs_sources == output_path:
+        raise IOError('The source and output directories are the same!')
+    if not os.path.isdir(docs_sources):
+        raise IOError('The directory: {0} does not exist!'.format(docs_sources))
+
+    jobs = jobs or (multiprocessing.cpu_count() if multi_thread else 1)
+
+    logger.info('Building docset...')
+    manifest = Manifest(get_manifest_path(output_path),
+                        'build',
+                        {'sources': os.path.abspath(docs_sources), 'maxVersion': max_version, 'engine': engine,
+                         'inheritedMembers': inherited_members, 'optimise': optimise})
+
+    rebuild = full or not manifest.files or not os.path.isdir(output_path) or not has_search_index(database_file_path)
+    if rebuild:
+        logger.debug('Performing full rebuild...')
+        manifest.clear()
+        manifest.save()
+        if not os.path.isdir(output_path):
+            os.makedirs(output_path)
+        clean_database(database_file_path)
+    # NOTE: The shared files of the optimised pages are kept, like
+    # :func:`clean_html_documentation.main` does.
+    keep = (SHARED_DIRECTORY,) if optimise and manifest.files else ()
+
+    # NOTE: Only the pages are tracked by the manifest; the assets are mirrored
+    # by comparing them against their copy in the output directory instead.
+    catalogue = scan_catalogue(docs_sources, get_catalogue_path(output_path))
+    changed, removed = manifest.diff(docs_sources, catalogue.pages, catalogue.stats)
+    logger.debug('Files changed: {0}, files removed: {1}'.format(len(changed), len(removed)))
+
+    sync_assets(docs_sources, output_path, asset_mode, keep=keep, catalogue=catalogue, store=store)
+
+    pages = sort_by_size(docs_sources, changed, catalogue.sizes)
+    logger.debug('Total number of files to process: {0} with {1} jobs'.format(len(pages), jobs))
+    results = {}
+    bases = {}
+    shared = {}
+    failed = set()
+    build_metrics = BuildMetrics(jobs)
+    with DatabaseWriter(database_file_path, rebuild=rebuild) as writer:
+        # Remove the entries of the files that have changed; they will be written again
+        [writer.delete(manifest.get(f, 'entries', []) + manifest.get(f, 'inherited', [])) for f in removed + changed]
+        writer.flush()
+        [manifest.remove(f) for f in removed]
+        for f, result, error in run_pipeline(process_page_prefetched,
+                                             pages,
+                                             functools.partial(read_page, docs_sources=docs_sources, catalogue=catalogue),
+                                             functools.partial(write_page_result, output_path=output_path),
+                                             (docs_sources, output_path, max_version, True, engine, optimise),
+                                             jobs,
+                                             pool):
+            if error:
+                logger.error('Failed to process: {0}!\n{1}'.format(f, error))
+                failed.add(f)
+                continue
+            entries, records, page_metrics = result
+            shared[f] = page_metrics.pop('shared', [])
+            watch = Stopwatch(page_metrics)
+            writer.insert(entries)
+            watch.lap('insert')
+            build_metrics.add_page(f, page_metrics)
+            results[f] = entries
+            bases[f] = get_base_pages(records)
+    build_metrics.finish()
+
+    for f in changed:
+        if f not in failed:
+            manifest.commit(f, entries=results.get(f, []), bases=bases.get(f, []), shared=shared.get(f, []))
+    if inherited_members and (changed or removed):
+        update_inherited_entries(database_file_path, manifest, failed)
+    manifest.save()
+    if optimise and keep:
+        referenced = [manifest.get(f, 'shared') for f in manifest.files]
+        if None not in referenced:
+            num_removed = prune_shared_files(output_path, set(path for paths in referenced for path in paths))
+            logger.debug('Removed {0} shared files no longer used.'.format(num_removed))
+    if search_tables and (changed or removed or not has_search_text(database_file_path)):
+        build_search_tables(database_file_path, docs_sources)
+    elif not search_tables:
+        drop_search_tables(database_file_path)
+    build_metrics.write(metrics_path or get_metrics_path(database_file_path, 'build'), top)
+    build_metrics.log_summary(logger, top)
+    if failed:
+        logger.error('Failed to process {0} pages!'.format(len(failed)))
+        return 1
+    logger.info('Build complete!')
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='This program formats the HTML documentation and generates the database entries for the docset in a single pass.')
+    parser.add_argument('-s',
+                        '--sources',
+                        type=str,
+                        help='The directory on disk where the original documentation is located.')
+    parser.add_argument('-o',
+                        '--output',
+                        type=str,
+                        help='The directory on disk where the newly-formatted documentation should be written to.')
+    parser.add_argument('-db',
+                        '--database',
+                        type=str,
+                        help='The full path to where the database should be written to.')
+    parser.add_argument('-mv',
+                        '--maxVersion',
+                        type=str,
+                        help='The 3ds max version of the docset to generate.',
+                        default='2017')
+    parser.add_argument('-mt',
+                        '--multiThread',
+                        action='store_true',
+                        help='If set, will run jobs in parallel. Uses more system resources.')
+    parser.add_argument('-j',
+                        '--jobs',
+                        type=int,
+                        help='The number of jobs to run in parallel. Defaults to the number of cores when multi-threading.')
+    parser.add_argument('-e',
+                        '--engine',
+                        choices=ENGINES,
+                        default='stream',
+                        help='The engine used to process the pages. The streaming engine is much faster; BeautifulSoup is kept as a fallback.')
+    parser.add_argument('-f',
+                        '--full',
+                        action='store_true',
+                        help='If set, rebuilds the docset from scratch instead of only processing the files that have changed.')
+    parser.add_argument('-m',
+                        '--metrics',
+                        type=str,
+                        help='The path to write the JSON metrics of the build to. Defaults to a file in the .docsetBuild directory next to the docset.')
+    parser.add_argument('-t',
+                        '--top',
+                        type=int,
+                        default=10,
+                        help='The number of the slowest and largest pages to report.')
+    parser.add_argument('-a',
+                        '--assetMode',
+                        choices=ASSET_MODES,
+                        default='copy',
+                        help='How the images, styles and scripts are mirrored to the docset. Hard links and reflinks are faster and use no extra space, but hard links share any later edit with the sources.')
+    parser.add_argument('-op',
+                        '--optimise',
+                        action='store_true',
+                        help='If set, removes the navigation, unused scripts, comments and extra whitespace of the pages, and moves their larger inline scripts and styles to shared files.')
+    parser.add_argument('-im',
+                        '--inheritedMembers',
+                        action='store_true',
+                        help='If set, also indexes the members each class inherits under the name of the class, e.g. Derived::BaseMethod.')
+    parser.add_argument('-st',
+                        '--searchTables',
+                        action='store_true',
+                        help='If set, also builds the prefix index and full-text table of the entry names and member descriptions used by search_index.py.')
+    parser.add_argument('-v',
+                        '--verbose',
+                        action='store_true',
+                        help='If set, logs every file processed. Slows down the build.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    sys.exit(main(args.sources,
+                  args.output,
+                  args.database,
+                  args.maxVersion,
+                  args.multiThread,
+                  args.full,
+                  args.jobs,
+                  args.engine,
+                  args.metrics,
+                  args.top,
+                  args.assetMode,
+                  search_tables=args.searchTables,
+                  inherited_members=args.inheritedMembers,
+                  optimise=args.optimise))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+"""
+This module is a script that builds the docsets of several versions of 3ds max
+in one go. The versions are built one after the other on a single pool of
+worker processes, and the identical files of their docsets are stored once in
+a content-addressed store and hard linked into each docset.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import build_docset
+from assets import ASSET_MODES
+from lib import ROOT_PATH, create_pool
+from store import STORE_NAME, ContentStore
+
+
+def get_version_paths(max_version, resources_path=None, output_path=None):
+    """
+    Returns the paths of the sources and outputs of the version given.
+
+    :param resources_path: ``str`` path to the directory containing the sources
+        of each version, in ``<version>/cpp_ref``. Defaults to ``resources``.
+
+    :param output_path: ``str`` path to the directory to write the docset of each
+        version to, as ``max-<version>-cpp.docset``. Defaults to the root of the
+        repository.
+
+    :return: ``tuple`` of the paths to the ``cpp_ref`` sources, the ``Documents``
+        directory and the database of the docset.
+    """
+    resources_path = resources_path or os.path.join(ROOT_PATH, 'resources')
+    output_path = output_path or ROOT_PATH
+    resources = os.path.join(output_path, 'max-{0}-cpp.docset'.format(max_version), 'Contents', 'Resources')
+    return (os.path.join(resources_path, max_version, 'cpp_ref'),
+            os.path.join(resources, 'Documents'),
+            os.path.join(resources, 'docSet.dsidx'))
+
+
+def main(versions,
+         resources_path=None,
+         output_path=None,
+         multi_thread=False,
+         full=False,
+         jobs=None,
+         engine='stream',
+         asset_mode='copy',
+         dedupe=True):
+    """
+    This is the main entry point of the program.
+
+    :param versions: ``list`` of the 3ds max versions to build the docsets of.
+
+    :param resources_path: ``str`` path to the directory containing the sources
+        of each version, in ``<version>/cpp_ref``.
+
+    :param output_path: ``str`` path to the directory to write the docsets to.
+
+    :param multi_thread: ``bool`` to indicate if multithreading support should be
+        enabled.
+
+    :param full: ``bool`` to indicate if the docsets should be rebuilt from scratch.
+
+    :param jobs: ``int`` number of worker processes to use. Defaults to the
+        number of cores if ``multi_thread`` is enabled.
+
+    :param engine: ``str`` name of the engine used to process the pages.
+
+    :param asset_mode: ``str`` how the assets are mirrored to each docset.
+
+    :param dedupe: ``bool`` to indicate if the identical files of the docsets
+        should be hard linked to a single copy.
+
+    :return: ``int`` exit code; non-zero if any version failed to build.
+    """
+    logger = logging.getLogger(__name__)
+    jobs = jobs or (multiprocessing.cpu_count() if multi_thread else 1)
+    store = ContentStore(os.path.join(output_path or ROOT_PATH, STORE_NAME)) if dedupe else None
+    # NOTE: The workers are shared by all versions, rather than started again for each one.
+    pool = create_pool(jobs) if jobs > 1 else None
+    failed = []
+    try:
+        for max_version in versions:
+            docs_sources, documents_path, database_file_path = get_version_paths(max_version,
+                                                                                 resources_path,
+                                                                                 output_path)
+            logger.info('Building docset for version: {0}...'.format(max_version))
+            if build_docset.main(docs_sources,
+                                 documents_path,
+                                 database_file_path,
+                                 max_version,
+                                 multi_thread,
+                                 full,
+                                 jobs,
+                                 engine,
+                                 asset_mode=asset_mode,
+                                 pool=pool,
+                                 store=store):
+                failed.append(max_version)
+            if store is not None:
+                stats = store.link_tree(documents_path)
+                logger.info('Stored {stored} new files, linked {linked} files to existing copies '
+                            '({0:.1f} MB saved), {unchanged} unchanged.'.format(stats['bytesSaved'] / 1048576.0,
+                                                                                **stats))
+        if pool is not None:
+            pool.close()
+    except:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        if pool is not None:
+            pool.join()
+
+    if store is not None:
+        logger.info('Removed {0} files no longer used from the store.'.format(store.prune()))
+        store.save()
+    if failed:
+        logger.error('Failed to build versions: {0}!'.format(', '.join(failed)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='This program builds the docsets of several versions of 3ds max, sharing the files they have in common.')
+    parser.add_argument('versions',
+                        nargs='+',
+                        help='The 3ds max versions to build the docsets of.')
+    parser.add_argument('-r',
+                        '--resources',
+                        type=str,
+                        help='The directory on disk containing the original documentation of each version, in <version>/cpp_ref.')
+    parser.add_argument('-o',
+                        '--output',
+                        type=str,
+                        help='The directory on disk to write the docset of each version to.')
+    parser.add_argument('-mt',
+                        '--multiThread',
+                        action='store_true',
+                        help='If set, will run jobs in parallel. Uses more system resources.')
+    parser.add_argument('-j',
+                        '--jobs',
+                        type=int,
+                        help='The number of jobs to run in parallel. Defaults to the number of cores when multi-threading.')
+    parser.add_argument('-e',
+                        '--engine',
+                        choices=build_docset.ENGINES,
+                        default='stream',
+                        help='The engine used to process the pages.')
+    parser.add_argument('-f',
+                        '--full',
+                        action='store_true',
+                        help='If set, rebuilds the docsets from scratch instead of only processing the files that have changed.')
+    parser.add_argument('-a',
+                        '--assetMode',
+                        choices=ASSET_MODES,
+                        default='copy',
+                        help='How the images, styles and scripts are mirrored to the docsets.')
+    parser.add_argument('-nd',
+                        '--noDedupe',
+                        action='store_true',
+                        help='If set, does not hard link the files the docsets have in common to a single copy.')
+    parser.add_argument('-v',
+                        '--verbose',
+                        action='store_true',
+                        help='If set, logs every file processed. Slows down the build.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    sys.exit(main(args.versions,
+                  args.resources,
+                  args.output,
+                  args.multiThread,
+                  args.full,
+                  args.jobs,
+                  args.engine,
+                  args.assetMode,
+                  not args.noDedupe))
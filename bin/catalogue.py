@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""
+This module contains the catalogue of the files of a documentation directory,
+built from a single directory scan. It records the kind of every file, the name
+of the symbol decoded from the name of each page, and its size and modification
+time, so that the scripts do not list the directory, stat its files or decode
+the names of its pages again at each step of a build.
+
+The catalogue is written next to the manifest, so that it is shared by every
+script that builds the docset, and the names decoded by the previous scan are
+reused for the files that are still there.
+"""
+import logging
+import os
+import time
+from doxygen import get_page_entry
+from lib import get_sidecar_path, load_json, save_json
+
+
+# NOTE: Bump this when the names of the pages are decoded differently, since the
+# names decoded by earlier scans are reused.
+CATALOGUE_VERSION = 2
+CATALOGUE_NAME = '.pageCatalogue.json'
+# NOTE: The kinds of the files that are not indexed: other pages, such as the
+# lists of all members of a class, and assets, such as images.
+PAGE_KIND = 'Page'
+ASSET_KIND = 'Asset'
+
+
+def get_catalogue_path(output_path):
+    """
+    Returns the path to the catalogue for the given output (either the
+    ``Documents`` directory or the database file).
+    """
+    return get_sidecar_path(output_path, CATALOGUE_NAME)
+
+
+def read_catalogues(path, warn=True):
+    """
+    Reads the catalogues stored in the file given.
+
+    :param warn: ``bool`` to indicate if a warning should be logged if the file
+        is corrupt.
+
+    :return: ``dict`` mapping the absolute path of each directory catalogued to
+        the ``dict`` of its files, see :class:`Catalogue`.
+    """
+    data = load_json(path, 'catalogue' if warn else None)
+    if not data or data.get('version') != CATALOGUE_VERSION:
+        return {}
+    return data.get('sources', {})
+
+
+def get_kind(filename):
+    """
+    Returns the kind of the file given and the name of the symbol it documents.
+
+    :return: ``tuple`` of the ``str`` kind, which is the type of its search index
+        entry for indexed pages, and the ``str`` name of the entry, or ``None``.
+    """
+    if not filename.endswith('.html'):
+        return ASSET_KIND, None
+    page_entry = get_page_entry(filename)
+    if page_entry is None:
+        return PAGE_KIND, None
+    return page_entry[1], page_entry[0]
+
+
+class Catalogue(object):
+    """
+    This class is the catalogue of the files directly in a documentation directory.
+
+    :param docs_sources: ``str`` path to the directory.
+
+    :param files: ``dict`` mapping the name of each file to a ``list`` of its
+        kind, symbol name, size and modification time.
+    """
+    def __init__(self, docs_sources, files=None):
+        self.docs_sources = docs_sources
+        self.files = files or {}
+
+    @classmethod
+    def scan(cls, docs_sources, previous=None):
+        """
+        Builds the catalogue of the directory given with a single ``os.scandir`` pass.
+
+        :param previous: ``dict`` of the files of earlier scans, as stored in
+            :attr:`files`, whose decoded names are reused.
+        """
+        previous_files = previous or {}
+        files = {}
+        for entry in os.scandir(docs_sources):
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            record = previous_files.get(entry.name)
+            kind, symbol = record[:2] if record else get_kind(entry.name)
+            files[entry.name] = [kind, symbol, stat.st_size, stat.st_mtime]
+        return cls(docs_sources, files)
+
+    @classmethod
+    def load(cls, path, docs_sources):
+        """
+        Reads the catalogue of the directory given written by :meth:`save`.
+
+        :return: :class:`Catalogue`, or ``None`` if there is no valid catalogue
+            of ``docs_sources`` at the path given.
+        """
+        files = read_catalogues(path).get(os.path.abspath(docs_sources))
+        return cls(docs_sources, files) if files is not None else None
+
+    def save(self, path):
+        """Writes the catalogue to disk, preserving those of other directories."""
+        catalogues = read_catalogues(path, False)
+        catalogues[os.path.abspath(self.docs_sources)] = self.files
+        save_json(path, {'version': CATALOGUE_VERSION, 'sources': catalogues})
+
+    @property
+    def pages(self):
+        """Returns the ``list`` of the names of the HTML pages."""
+        return [f for f, record in self.files.items() if record[0] != ASSET_KIND]
+
+    @property
+    def assets(self):
+        """Returns the ``list`` of the names of the files that are not HTML pages."""
+        return [f for f, record in self.files.items() if record[0] == ASSET_KIND]
+
+    @property
+    def sizes(self):
+        """Returns the ``dict`` of the size of each file."""
+        return dict((f, record[2]) for f, record in self.files.items())
+
+    @property
+    def stats(self):
+        """Returns the ``dict`` of the size and modification time of each file."""
+        return dict((f, (record[2], record[3])) for f, record in self.files.items())
+
+    def get_page_entry(self, filename):
+        """
+        Returns the search index entry for the page given, like
+        :func:`doxygen.get_page_entry`, without decoding its name again.
+        """
+        record = self.files.get(filename)
+        if record is None:
+            return get_page_entry(filename)
+        if record[0] in (PAGE_KIND, ASSET_KIND):
+            return None
+        return (record[1], record[0], filename)
+
+
+def scan_catalogue(docs_sources, catalogue_path=None):
+    """
+    Scans the directory given, reusing the names decoded by the catalogues at
+    ``catalogue_path`` if there are any, and writes the new catalogue there.
+
+    The names are reused from the catalogues of other directories too, since
+    they only depend on the names of the files, e.g. the sources and the
+    formatted pages share their names.
+
+    :return: :class:`Catalogue` of the directory.
+    """
+    logger = logging.getLogger(__name__)
+    start = time.time()
+    previous = {}
+    catalogues = read_catalogues(catalogue_path)
+    # NOTE: The catalogue of the directory itself takes precedence.
+    for sources in sorted(catalogues, key=lambda d: d == os.path.abspath(docs_sources)):
+        previous.update(catalogues[sources])
+    catalogue = Catalogue.scan(docs_sources, previous)
+    if catalogue_path:
+        catalogue.save(catalogue_path)
+    logger.debug('Catalogued {0} files in {1:.2f}s.'.format(len(catalogue.files), time.time() - start))
+    return catalogue
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+This module contains the class hierarchy of the documentation, which is used to
+index the members each class inherits. The class pages only link inherited
+members to the page of the class that declares them, so without it searching
+for ``Derived::BaseMethod`` finds nothing.
+
+The graph is built from the entries and base classes of the pages that have
+already been processed, so no page is ever parsed again to resolve the members
+of its subclasses.
+"""
+import logging
+import time
+from database import DatabaseWriter
+
+
+class ClassGraph(object):
+    """
+    This class is the in-memory graph of the classes of the documentation: the
+    pages of the classes each class inherits from, and the members it declares.
+
+    The members of each class, declared and inherited, are resolved once and
+    memoised, so resolving every class costs time linear in the number of
+    classes and members, however deep the hierarchy is (e.g. every subclass of
+    ``ReferenceTarget`` shares the members resolved for it).
+    """
+    def __init__(self):
+        self.classes = {}
+        self._members = {}
+
+    def add_class(self, filename, entries, bases):
+        """
+        Adds a class to the graph.
+
+        :param filename: ``str`` name of the page of the class.
+
+        :param entries: ``list`` of the ``(name, type, path)`` search index entries
+            of the page, starting with the entry of the class itself.
+
+        :param bases: ``list`` of the pages of the classes it inherits from, as
+            returned by :func:`doxygen.get_base_pages`.
+        """
+        class_name = entries[0][0]
+        prefix = class_name + '::'
+        members = {}
+        for name, entry_type, path in entries[1:]:
+            if name.startswith(prefix):
+                members.setdefault(name[len(prefix):], []).append((entry_type, path))
+        self.classes[filename] = (class_name, bases, members)
+        self._members = {}
+
+    def get_members(self, filename, _resolving=None):
+        """
+        Returns the members of the class given, declared and inherited. Members
+        declared by the class hide those of the same name in its bases, and the
+        bases listed first take precedence over the others.
+
+        :return: ``dict`` mapping the name of each member to the ``list`` of the
+            ``(type, path)`` of each of its overloads.
+        """
+        if filename in self._members:
+            return self._members[filename]
+        _resolving = _resolving or set()
+        _, bases, members = self.classes[filename]
+        members = dict(members)
+        # NOTE: Guards against cycles, which a broken page could introduce.
+        _resolving.add(filename)
+        for base in bases:
+            if base not in self.classes or base in _resolving:
+                continue
+            for name, overloads in self.get_members(base, _resolving).items():
+                members.setdefault(name, overloads)
+        _resolving.discard(filename)
+        self._members[filename] = members
+        return members
+
+    def get_inherited_entries(self):
+        """
+        Returns the search index entries of the members each class inherits,
+        named after the class and pointing to the page that documents them.
+
+        :return: ``dict`` mapping the page of each class to its ``list`` of
+            ``(name, type, path)`` entries, sorted by name.
+        """
+        results = {}
+        for filename, (class_name, _, declared) in self.classes.items():
+            entries = []
+            for name, overloads in sorted(self.get_members(filename).items()):
+                if name in declared:
+                    continue
+                member_name = '{0}::{1}'.format(class_name, name)
+                entries.extend((member_name, entry_type, path) for entry_type, path in overloads)
+            results[filename] = entries
+        return results
+
+
+def update_inherited_entries(database_file_path, manifest, skip=()):
+    """
+    Resolves the members inherited by every class recorded in the manifest
+    given, and writes the entries that have changed since the last run to the
+    database. The entries of each class are recorded as ``inherited`` in its
+    record of the manifest, which still has to be saved.
+
+    :param manifest: :class:`manifest.Manifest` whose records hold the ``entries``
+        and ``bases`` of each page.
+
+    :param skip: ``set`` of the pages that failed to be processed, which are
+        not updated.
+
+    :return: ``int`` number of inherited entries in the database.
+    """
+    logger = logging.getLogger(__name__)
+    start = time.time()
+    graph = ClassGraph()
+    for f in manifest.files:
+        entries = manifest.get(f, 'entries', [])
+        if f not in skip and entries and entries[0][1] == 'Class':
+            graph.add_class(f, entries, manifest.get(f, 'bases', []))
+    num_entries = 0
+    num_updated = 0
+    with DatabaseWriter(database_file_path) as writer:
+        for f, entries in graph.get_inherited_entries().items():
+            entries = [list(e) for e in entries]
+            num_entries += len(entries)
+            previous = manifest.get(f, 'inherited', [])
+            if entries == previous:
+                continue
+            writer.delete(previous)
+            writer.insert(entries)
+            manifest.commit(f, inherited=entries)
+            num_updated += 1
+    logger.info('Resolved {0} inherited members of {1} classes in {2:.2f}s, updated {3} classes.'.format(
+        num_entries, len(graph.classes), time.time() - start, num_updated))
+    return num_entries
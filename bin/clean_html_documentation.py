@@ -4,75 +4,39 @@ This module is a script that cleans up the default HTML 3ds max Doxygen
 documentation to be usable as standalone.
 """
 import argparse
+import functools
 import logging
 import multiprocessing
 import os
-import shutil
-from bs4 import BeautifulSoup
-from lib import chunk
+import sys
+from assets import ASSET_MODES, sync_assets
+from catalogue import get_catalogue_path, scan_catalogue
+from build_docset import ENGINES, process_page, process_page_prefetched, read_page, write_page_result
+from html_optimiser import SHARED_DIRECTORY, prune_shared_files
+from lib import get_documents_path, get_sources_path, run_pipeline, sort_by_size
+from manifest import Manifest, get_manifest_path
+from metrics import BuildMetrics, get_metrics_path
 
 
-def format_files(all_files, docs_path, output_path, job_number=0):
+def format_files(all_files, docs_path, output_path, job_number=0, engine='stream'):
     """
     This function formats the ``list`` of HTML documentation files given and
     writes the output files to a subdirectory.
     """
-    logging.basicConfig(level=logging.DEBUG)
     logger = logging.getLogger('format_files_{0}'.format(str(job_number)))
-    for i, f in enumerate(all_files):
-        if os.path.splitext(f)[-1] != '.html':
-            continue
-        logger.debug('Processing: {0}...'.format(f))
-        html = open(os.path.join(docs_path, f)).read()
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        for img in soup.find_all('img'):
-            src = img.get('src')
-            if src:
-                img['src'] = src.replace('cpp_ref/', './')
-
-        for script in soup.find_all('script'):
-            src = script.get('src')
-            if src:
-                if 'www.microsofttranslator.com' in src:
-                    script['src'] = ''
-                script['src'] = src.replace('../scripts', './scripts')
-        
-        links = soup.find_all('a') + soup.find_all('link')
-
-        for link in links:
-            href = link.get('href')
-            if href: 
-                link['href'] = href.replace('style/', './')\
-                                   .replace('#!/url=./cpp_ref/', './')\
-                                   .replace('cpp_ref/', './')
-
-        # Also insert anchors in order for table of contents to work
-        for td in soup.find_all('td'):
-            if td.get('class') and 'memname' in td.get('class') and td.a:
-                member_name = td.contents[-1]
-                if member_name and len(member_name) > 2:
-                    member_name_components = member_name.split(' ')
-                    if len(member_name_components) < 2:
-                        logger.warning('Skipped member: {0}!'.format(member_name))
-                        continue
-                    member_name = member_name_components[-2]
-                    new_tag = soup.new_tag('a')
-                    new_tag['name'] = '//apple_ref/cpp/Function/{0}'.format(member_name)
-                    new_tag['class'] = 'dashAnchor'
-                    td.insert(0, new_tag)
-
-        with open(os.path.join(output_path, f), 'w') as of:
-            of.write(str(soup))
+    for f in all_files:
+        process_page(f, docs_path, output_path, index=False, engine=engine, logger=logger)
 
     logger.debug('Job complete!')
+    return all_files
 
 
-def main(docs_sources, output_path, multi_thread=False, max_version='2017'):
+def main(docs_sources, output_path, multi_thread=False, max_version='2017', full=False, jobs=None, engine='stream', metrics_path=None, top=10, asset_mode='copy', optimise=False):
     """
     This is the main entry point of the program. It formats the HTML sources 
     specified in ``docs_sources`` and writes them to the ``output_path`` directory 
-    specified.
+    specified. Only the files that have changed since the last run are
+    formatted, unless ``full`` is set.
 
     :param docs_sources: ``str`` path to the original documentation sources. This 
         should contain the ``cpp_ref`` folder, among other resources.
@@ -84,62 +48,103 @@ def main(docs_sources, output_path, multi_thread=False, max_version='2017'):
 
     :param max_version: ``str`` indicating what version of 3ds max the docset 
         being generated for is.
+
+    :param full: ``bool`` to indicate if all files should be formatted again.
+
+    :param jobs: ``int`` number of worker processes to use. Defaults to the
+        number of cores if ``multi_thread`` is enabled.
+
+    :param engine: ``str`` name of the engine used to process the pages; either
+        ``stream`` or ``soup``.
+
+    :param metrics_path: ``str`` path to write the metrics of the run to. Defaults
+        to a file next to the manifest.
+
+    :param top: ``int`` number of the slowest and largest pages to report.
+
+    :param asset_mode: ``str`` how the assets are mirrored to ``output_path``;
+        either ``copy``, ``hardlink`` or ``reflink``.
+
+    :param optimise: ``bool`` to indicate if the size of the formatted pages should
+        be optimised, by removing their navigation, unused scripts and extra
+        whitespace, and moving their larger inline scripts and styles to shared files.
+
+    :return: ``int`` exit code; non-zero if any page failed to be formatted.
     """
     logger = logging.getLogger(__name__)
     if not docs_sources:
-        docs_sources = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                                    'resources',
-                                    max_version,
-                                    'cpp_ref')
+        docs_sources = get_sources_path(max_version)
     if not output_path:
-        output_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                                'max-{0}-cpp.docset'.format(max_version),
-                                'Contents',
-                                'Resources',
-                                'Documents')
+        output_path = get_documents_path(max_version)
     if docs_sources == output_path:
         raise IOError('The source and output directories are the same!')
     if not os.path.isdir(docs_sources):
         raise IOError('The directory: {0} does not exist!'.format(docs_sources))
 
     logger.info('Formatting documentation...')
-
-    if os.path.isdir(output_path):
-        logger.debug('Removing existing directory: {0}!'.format(output_path))
-        shutil.rmtree(output_path)
-    os.makedirs(output_path)
+    manifest = Manifest(get_manifest_path(output_path),
+                        'format',
+                        {'sources': os.path.abspath(docs_sources), 'engine': engine, 'optimise': optimise})
+
+    if full or not manifest.files or not os.path.isdir(output_path):
+        manifest.clear()
+        if not os.path.isdir(output_path):
+            os.makedirs(output_path)
+    # NOTE: The shared files of the optimised pages are kept, unless every page is
+    # formatted again, in which case those still in use are written again. Those
+    # no page loads any more are removed once the pages have been formatted.
+    keep = (SHARED_DIRECTORY,) if optimise and manifest.files else ()
+
+    # NOTE: Only the pages are tracked by the manifest; the assets are mirrored
+    # by comparing them against their copy in the output directory instead.
+    catalogue = scan_catalogue(docs_sources, get_catalogue_path(output_path))
+    changed, removed = manifest.diff(docs_sources, catalogue.pages, catalogue.stats)
+    logger.debug('Files changed: {0}, files removed: {1}'.format(len(changed), len(removed)))
+    [manifest.remove(f) for f in removed]
 
     # NOTE (sonictk): Copy over the necessary resource files first
-    styles_path = os.path.join(os.path.dirname(docs_sources), 'style')
-    if not os.path.isdir(styles_path):
-        raise IOError('The CSS styles directory: {0} does not exist!'.format(styles_path))
-    [shutil.copy(os.path.join(styles_path, css), output_path) for css in os.listdir(styles_path)]
-
-    scripts_path = os.path.join(os.path.dirname(docs_sources), 'scripts')
-    if not os.path.isdir(scripts_path):
-        raise IOError('The JScript directory: {0} does not exist!'.format(scripts_path))
-    shutil.copytree(scripts_path, os.path.join(output_path, 'scripts'))
-
-    all_files = os.listdir(docs_sources)
-    logger.debug('Total number of files to process: {0}'.format(len(all_files)))
-    for f in all_files:
-        if os.path.splitext(f)[-1] != '.html':
-            # NOTE (sonictk): Just copy it over anyway, since those files are needed (CSS, scripts etc.)
-            shutil.copy(os.path.join(docs_sources, f), output_path)
-    if multi_thread:
-        jobs = []
-        for idx, s in enumerate(chunk(all_files, 500)):
-            job = multiprocessing.Process(target=format_files, args=(s, docs_sources, output_path, idx))
-            jobs.append(job)
-        logger.debug('Num. of jobs scheduled: {0}'.format(len(jobs)))
-        [j.start() for j in jobs]
-        logger.info('Jobs submitted, please wait for them to complete!')
-    else:
-        format_files(all_files, docs_sources, output_path)
+    sync_assets(docs_sources, output_path, asset_mode, keep=keep, catalogue=catalogue)
+
+    pages = sort_by_size(docs_sources, changed, catalogue.sizes)
+    jobs = jobs or (multiprocessing.cpu_count() if multi_thread else 1)
+    logger.debug('Total number of files to process: {0} with {1} jobs'.format(len(pages), jobs))
+    failed = set()
+    shared = {}
+    run_metrics = BuildMetrics(jobs)
+    # NOTE: The pages are read and written on threads of this process, overlapping
+    # the disk with the workers formatting them.
+    for f, result, error in run_pipeline(process_page_prefetched,
+                                         pages,
+                                         functools.partial(read_page, docs_sources=docs_sources, catalogue=catalogue),
+                                         functools.partial(write_page_result, output_path=output_path),
+                                         (docs_sources, output_path, max_version, False, engine, optimise),
+                                         jobs):
+        if error:
+            logger.error('Failed to format: {0}!\n{1}'.format(f, error))
+            failed.add(f)
+            continue
+        shared[f] = result[2].pop('shared', [])
+        run_metrics.add_page(f, result[2])
+    run_metrics.finish()
+
+    [manifest.commit(f, shared=shared.get(f, [])) for f in changed if f not in failed]
+    manifest.save()
+    if optimise and keep:
+        referenced = [manifest.get(f, 'shared') for f in manifest.files]
+        # NOTE: The shared files loaded by pages formatted before they were
+        # recorded are unknown, so none are removed until those are formatted again.
+        if None not in referenced:
+            num_removed = prune_shared_files(output_path, set(path for paths in referenced for path in paths))
+            logger.debug('Removed {0} shared files no longer used.'.format(num_removed))
+    run_metrics.write(metrics_path or get_metrics_path(output_path, 'format'), top)
+    run_metrics.log_summary(logger, top)
+    if failed:
+        logger.error('Failed to format {0} pages!'.format(len(failed)))
+        return 1
+    return 0
 
 
 if __name__ == '__main__':
-    logging.basicConfig(level=logging.DEBUG)
     parser = argparse.ArgumentParser(description='This program formats the HTML documentation so that it is usable in the docset.')
     parser.add_argument('-s',
                         '--sources',
@@ -156,11 +161,53 @@ if __name__ == '__main__':
                         default='2017')
     parser.add_argument('-mt',
                         '--multiThread',
-                        default=False,
-                        type=bool,
-                        help='If set to True, will run jobs in parallel. Uses more system resources.')
+                        action='store_true',
+                        help='If set, will run jobs in parallel. Uses more system resources.')
+    parser.add_argument('-j',
+                        '--jobs',
+                        type=int,
+                        help='The number of jobs to run in parallel. Defaults to the number of cores when multi-threading.')
+    parser.add_argument('-e',
+                        '--engine',
+                        choices=ENGINES,
+                        default='stream',
+                        help='The engine used to process the pages. The streaming engine is much faster; BeautifulSoup is kept as a fallback.')
+    parser.add_argument('-f',
+                        '--full',
+                        action='store_true',
+                        help='If set, formats all files again instead of only the files that have changed.')
+    parser.add_argument('-m',
+                        '--metrics',
+                        type=str,
+                        help='The path to write the JSON metrics of the run to. Defaults to a file in the .docsetBuild directory next to the docset.')
+    parser.add_argument('-t',
+                        '--top',
+                        type=int,
+                        default=10,
+                        help='The number of the slowest and largest pages to report.')
+    parser.add_argument('-a',
+                        '--assetMode',
+                        choices=ASSET_MODES,
+                        default='copy',
+                        help='How the images, styles and scripts are mirrored to the output directory. Hard links and reflinks are faster and use no extra space, but hard links share any later edit with the sources.')
+    parser.add_argument('-op',
+                        '--optimise',
+                        action='store_true',
+                        help='If set, removes the navigation, unused scripts, comments and extra whitespace of the pages, and moves their larger inline scripts and styles to shared files.')
+    parser.add_argument('-v',
+                        '--verbose',
+                        action='store_true',
+                        help='If set, logs every file processed. Slows down the run.')
     cmdline_args = parser.parse_args()
-    main(cmdline_args.sources,
-         cmdline_args.output,
-         cmdline_args.multiThread,
-         cmdline_args.maxVersion)
+    logging.basicConfig(level=logging.DEBUG if cmdline_args.verbose else logging.INFO)
+    sys.exit(main(cmdline_args.sources,
+                  cmdline_args.output,
+                  cmdline_args.multiThread,
+                  cmdline_args.maxVersion,
+                  cmdline_args.full,
+                  cmdline_args.jobs,
+                  cmdline_args.engine,
+                  cmdline_args.metrics,
+                  cmdline_args.top,
+                  cmdline_args.assetMode,
+                  cmdline_args.optimise))
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+This module is a script that checks that the streaming engine and the
+BeautifulSoup engine format the documentation equivalently. Every page is
+formatted with both engines, and the links, Dash anchors and search index
+entries of the results are compared.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from bs4 import BeautifulSoup
+from build_docset import format_soup, get_member_entries
+from doxygen import LINK_ATTRIBUTES, get_page_entry
+from html_rewriter import rewrite_page
+from lib import get_sources_path
+
+
+def get_links(html):
+    """
+    Returns the links and Dash anchors of the formatted page given.
+
+    :return: ``tuple`` of the ``list`` of ``(tag, url)`` links and the ``list``
+        of anchor names, in the order they appear in the page.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    links = [(tag.name, tag.get(LINK_ATTRIBUTES[tag.name]))
+             for tag in soup.find_all(list(LINK_ATTRIBUTES))
+             if 'dashAnchor' not in (tag.get('class') or [])]
+    anchors = [tag.get('name') for tag in soup.find_all('a', {'class': 'dashAnchor'})]
+    return links, anchors
+
+
+def compare_page(html, class_name=None, max_version='2017', logger=None):
+    """
+    Formats the page given with both engines and compares the results.
+
+    :return: ``tuple`` of the ``list`` of differences found, and the time taken
+        by the BeautifulSoup and the streaming engines respectively.
+    """
+    logger = logger or logging.getLogger(__name__)
+    start = time.time()
+    soup = BeautifulSoup(html, 'html.parser')
+    format_soup(soup, logger)
+    soup_entries = get_member_entries(soup, class_name, max_version) if class_name else []
+    soup_html = str(soup)
+    soup_time = time.time() - start
+
+    start = time.time()
+    stream_html, stream_entries = rewrite_page(html, class_name, max_version, True, logger)
+    stream_time = time.time() - start
+
+    differences = []
+    soup_links, soup_anchors = get_links(soup_html)
+    stream_links, stream_anchors = get_links(stream_html)
+    if soup_links != stream_links:
+        differences.append('links: {0}'.format(sorted(set(soup_links) ^ set(stream_links)) or 'order differs'))
+    if soup_anchors != stream_anchors:
+        differences.append('anchors: {0}'.format(sorted(set(soup_anchors) ^ set(stream_anchors)) or 'order differs'))
+    if soup_entries != stream_entries:
+        differences.append('entries: {0}'.format(sorted(set(soup_entries) ^ set(stream_entries)) or 'order differs'))
+    return differences, soup_time, stream_time
+
+
+def main(docs_sources, max_version='2017'):
+    """
+    This is the main entry point of the program.
+
+    :param docs_sources: ``str`` path to the original documentation sources.
+
+    :param max_version: ``str`` indicating what version of 3ds max the documentation
+        is for.
+
+    :return: ``int`` exit code; non-zero if the engines differ on any page.
+    """
+    logger = logging.getLogger(__name__)
+    if not docs_sources:
+        docs_sources = get_sources_path(max_version)
+    if not os.path.isdir(docs_sources):
+        raise IOError('The directory: {0} does not exist!'.format(docs_sources))
+
+    num_pages = 0
+    num_different = 0
+    total_soup_time = 0.0
+    total_stream_time = 0.0
+    for f in sorted(os.listdir(docs_sources)):
+        if os.path.splitext(f)[-1] != '.html':
+            continue
+        page_entry = get_page_entry(f)
+        class_name = page_entry[0] if page_entry and page_entry[1] == 'Class' else None
+        html = open(os.path.join(docs_sources, f)).read()
+        differences, soup_time, stream_time = compare_page(html, class_name, max_version, logger)
+        num_pages += 1
+        total_soup_time += soup_time
+        total_stream_time += stream_time
+        if differences:
+            num_different += 1
+            logger.error('{0} differs:\n    {1}'.format(f, '\n    '.join(differences)))
+
+    logger.info('Compared {0} pages, {1} differ.'.format(num_pages, num_different))
+    if total_stream_time:
+        logger.info('BeautifulSoup: {0:.2f}s, streaming: {1:.2f}s ({2:.1f}x faster)'.format(
+            total_soup_time, total_stream_time, total_soup_time / total_stream_time))
+    return 1 if num_different else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='This program checks that the streaming and BeautifulSoup engines format the documentation equivalently.')
+    parser.add_argument('-s',
+                        '--sources',
+                        type=str,
+                        help='The directory on disk where the original documentation is located.')
+    parser.add_argument('-mv',
+                        '--maxVersion',
+                        type=str,
+                        help='The 3ds max version of the documentation.',
+                        default='2017')
+    args = parser.parse_args()
+    sys.exit(main(args.sources, args.maxVersion))
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+This module contains the functions used to write to the SQLite database that
+is used for lookup of documentation entries.
+
+All writes go through a single :class:`DatabaseWriter`. The parser workers
+only extract entries and send them back to the writer in batches, so that the
+database is never locked by more than one connection during a build.
+"""
+import logging
+import sqlite3
+
+
+def clean_database(database_file_path):
+    """
+    This clears the database of current search entries. The unique index on
+    the entries is created by the :class:`DatabaseWriter` once the entries have
+    been written, since it is much faster to build the index after a bulk load.
+    """
+    logger = logging.getLogger(__name__)
+    logger.debug('Making connection to database...')
+    conn = sqlite3.connect(database_file_path)
+    cur = conn.cursor()
+
+    try:
+        logger.debug('Cleaning database...')
+        cur.execute('DROP TABLE IF EXISTS searchIndex;')
+        cur.execute('CREATE TABLE searchIndex(id INTEGER PRIMARY KEY, name TEXT, type TEXT, path TEXT);')
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def has_search_index(database_file_path):
+    """Returns ``True`` if the database given already contains the search index."""
+    conn = sqlite3.connect(database_file_path)
+    try:
+        return conn.execute('SELECT name FROM sqlite_master WHERE type = \'table\' AND name = \'searchIndex\';').fetchone() is not None
+    finally:
+        conn.close()
+
+
+class DatabaseWriter(object):
+    """
+    This class is the single writer for the search index of the docset. Entries
+    are buffered and written with ``executemany`` in explicit transactions.
+
+    :param database_file_path: ``str`` path to the docset database.
+
+    :param batch_size: ``int`` number of entries to buffer before they are written.
+
+    :param rebuild: ``bool`` to indicate if the database has just been cleaned
+        by :func:`clean_database` for a full rebuild. Otherwise it is updated
+        in place, and keeps the default rollback journal.
+    """
+    def __init__(self, database_file_path, batch_size=10000, rebuild=False):
+        self.database_file_path = database_file_path
+        self.batch_size = batch_size
+        self.logger = logging.getLogger(__name__)
+        self.num_entries = 0
+        self._inserts = []
+        self._deletes = []
+        self.conn = sqlite3.connect(database_file_path, isolation_level=None)
+        if rebuild:
+            # NOTE: The manifest is cleared before a full rebuild, so the next build
+            # starts over if this one is interrupted, and durability is traded for
+            # speed while writing. An incremental update of the database keeps the
+            # rollback journal, since nothing would detect a corrupt index.
+            self.conn.execute('PRAGMA journal_mode = MEMORY;')
+            self.conn.execute('PRAGMA synchronous = OFF;')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.conn.close()
+
+    def insert(self, entries):
+        """Queues the ``(name, type, path)`` entries given to be written."""
+        self._inserts.extend(entries)
+        if len(self._inserts) >= self.batch_size:
+            self.flush()
+
+    def delete(self, entries):
+        """Queues the ``(name, type, path)`` entries given to be deleted."""
+        self._deletes.extend([tuple(e) for e in entries])
+        if len(self._deletes) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes all queued changes to the database in a single transaction."""
+        if not self._inserts and not self._deletes:
+            return
+        cur = self.conn.cursor()
+        cur.execute('BEGIN;')
+        try:
+            # NOTE: Deletions are always queued before the entries that replace them.
+            cur.executemany('DELETE FROM searchIndex WHERE name = ? AND type = ? AND path = ?;', self._deletes)
+            cur.executemany('INSERT OR IGNORE INTO searchIndex(name, type, path) VALUES (?, ?, ?);', self._inserts)
+            cur.execute('COMMIT;')
+        except:
+            cur.execute('ROLLBACK;')
+            raise
+        self.num_entries += len(self._inserts)
+        self._inserts = []
+        self._deletes = []
+
+    def close(self):
+        """
+        Writes any remaining changes and creates the unique index on the
+        entries if it does not exist yet, removing any duplicate entries that
+        were written while the index did not exist.
+        """
+        try:
+            self.flush()
+            cur = self.conn.cursor()
+            if cur.execute('SELECT name FROM sqlite_master WHERE type = \'index\' AND name = \'anchor\';').fetchone() is None:
+                self.logger.debug('Creating index on search entries...')
+                cur.execute('BEGIN;')
+                cur.execute('DELETE FROM searchIndex WHERE id NOT IN '
+                            '(SELECT MIN(id) FROM searchIndex GROUP BY name, type, path);')
+                cur.execute('CREATE UNIQUE INDEX anchor ON searchIndex (name, type, path);')
+                cur.execute('COMMIT;')
+            self.logger.debug('Wrote {0} entries to the database.'.format(self.num_entries))
+        finally:
+            self.conn.close()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+"""
+This module contains the rules that describe the layout of the 3ds max Doxygen
+documentation: how its links are rewritten to work standalone, which sections
+of the class pages are indexed and how the pages are named. They are shared by
+every engine that formats or indexes the documentation.
+"""
+import html
+import logging
+import re
+
+
+# NOTE: Maps the anchor name of each Doxygen ``groupheader`` section that is
+# indexed to the entry type used in the database, and whether inherited
+# members listed in that section should be skipped.
+MEMBER_SECTIONS = {
+    'pub-types': ('Type', True),
+    'pub-methods': ('Method', True),
+    'pub-static-methods': ('Function', True),
+    'pro-methods': ('Method', False),
+}
+
+# NOTE: The rules that differ between versions of the documentation. The rules
+# of each version override the defaults; versions not listed use the defaults.
+# ``member_url_replacements`` are applied in order to the link of each member
+# to get the path stored in the database.
+DEFAULT_VERSION_RULES = {
+    'member_sections': MEMBER_SECTIONS,
+    'member_url_replacements': (),
+}
+VERSION_RULES = {
+    # NOTE: For 2017, it seems the URL is formatted differently
+    '2017': {
+        'member_url_replacements': (('#!/url=./cpp_ref/', ''),),
+    },
+}
+
+# NOTE: Bump this whenever the member records extracted from the class pages
+# change, so that the records cached by previous versions are discarded.
+EXTRACTOR_VERSION = 1
+
+# NOTE: The attribute holding the link of each tag that needs to be rewritten.
+LINK_ATTRIBUTES = {
+    'img': 'src',
+    'script': 'src',
+    'a': 'href',
+    'link': 'href',
+}
+
+# NOTE: The ids of the navigation blocks of the Autodesk pages, which are not
+# needed in the docset since Dash has its own index.
+NAV_IDS = frozenset(['navrow1', 'navrow2', 'navrow3', 'navrow4', 'nav-path',
+                     'side-nav', 'nav-tree', 'MSearchSelectWindow', 'MSearchResultsWindow'])
+
+# NOTE: Scripts whose source or contents match any of these are not used in the
+# docset: the translation widget needs a network connection, and the navigation
+# tree is not shipped. Scripts loaded from other sites are never used either.
+DEAD_SCRIPT_PATTERNS = ('microsofttranslator.com', 'initNavTree', 'google-analytics.com')
+
+# NOTE: The characters that Doxygen escapes in the names of its pages, as ``_``
+# followed by the code given. Upper case letters are escaped as ``_`` followed by
+# the letter in lower case, and ``_`` itself as ``__``.
+ESCAPED_CHARACTERS = {
+    '1': ':', '2': '/', '3': '<', '4': '>', '5': '*', '6': '&', '7': '|', '8': '.', '9': '!',
+    '00': ',', '01': ' ', '02': '{', '03': '}', '04': '?', '05': '^', '06': '%', '07': '(',
+    '08': ')', '09': '+', '0a': '=', '0b': '$', '0c': '\\', '0d': '@', '0e': ']', '0f': '[',
+    '0g': '#',
+}
+MANGLED_RE = re.compile(r'_(_|0[0-9a-g]|[1-9]|[a-z])')
+
+# NOTE: The kinds of pages that are indexed, matched in order against the name of
+# each page without its extension, and the function that turns the ``name`` group
+# of the match into the name of the entry. Classes, structs, unions and namespaces
+# are named after their symbol; the other pages get a readable title. Header files
+# are matched first, since their escaped names may start with a symbol prefix
+# (e.g. ``class__desc_8h`` documents ``class_desc.h``), and the index pages of
+# the namespaces are not namespaces.
+PAGE_PATTERNS = (
+    (re.compile(r'(?P<name>.*)_8h$'), 'File', lambda name: get_title(name)),
+    (re.compile(r'class(?P<name>_.*)'), 'Class', lambda name: decode_name(name)),
+    (re.compile(r'struct(?P<name>_.*)'), 'Struct', lambda name: decode_name(name)),
+    (re.compile(r'namespace(?!s$|members)(?P<name>.+)'), 'Namespace', lambda name: decode_name(name)),
+    (re.compile(r'(?P<name>.*?)-example'), 'Sample', lambda name: get_title(name) + 'Example'),
+    (re.compile(r'group___(?P<name>.*)'), 'Module', lambda name: get_title(name, ' ')),
+    (re.compile(r'union(?P<name>_.*)'), 'Union', lambda name: decode_name(name)),
+)
+
+# NOTE: The brief description of each member listed in a class page is in the
+# ``memdesc`` row that follows it, ending with a "More..." link to the details.
+MEMBER_BRIEF_RE = re.compile(r'<tr class="memdesc:(\w+)"[^>]*>\s*<td class="mdescLeft"[^>]*>.*?</td>\s*'
+                             r'<td class="mdescRight"[^>]*>(.*?)</td>', re.DOTALL)
+TAG_RE = re.compile(r'<[^>]*>')
+MORE_LINK_RE = re.compile(r'<a [^>]*>More\.\.\.</a>')
+
+
+def rewrite_link(tag_name, url):
+    """
+    Returns the link given, found on a tag of type ``tag_name``, rewritten so
+    that it works standalone in the docset.
+    """
+    if tag_name == 'img':
+        return url.replace('cpp_ref/', './')
+    elif tag_name == 'script':
+        return url.replace('../scripts', './scripts')
+    return url.replace('style/', './')\
+              .replace('#!/url=./cpp_ref/', './')\
+              .replace('cpp_ref/', './')
+
+
+def get_version_rules(max_version='2017'):
+    """
+    Returns the rules for the version of the documentation given.
+
+    :return: ``dict`` of the rules of ``max_version`` from :data:`VERSION_RULES`,
+        falling back to :data:`DEFAULT_VERSION_RULES`.
+    """
+    rules = dict(DEFAULT_VERSION_RULES)
+    rules.update(VERSION_RULES.get(max_version, {}))
+    return rules
+
+
+def get_member_url(url, max_version='2017'):
+    """Returns the path stored in the database for a link to a class member."""
+    for old, new in get_version_rules(max_version)['member_url_replacements']:
+        url = url.replace(old, new)
+    return url
+
+
+def get_member_entries_from_records(records, class_name, max_version='2017', rewrite=False):
+    """
+    Returns the search index entries for the members of a class, given the
+    records extracted from its page. The records only depend on the contents of
+    the page, while the rules that turn them into entries are applied here, so
+    that the entries can be regenerated from cached records.
+
+    :param records: ``list`` of ``(section, row_classes, link_classes, url, name)``
+        records, one per member listed in the page.
+
+    :param class_name: ``str`` name of the class the page documents.
+
+    :param max_version: ``str`` indicating what version of 3ds max the page is from.
+
+    :param rewrite: ``bool`` to indicate if the links of the page are rewritten
+        when it is formatted, in which case the entries point to the rewritten links.
+
+    :return: ``list`` of ``(name, type, path)`` tuples.
+    """
+    rules = get_version_rules(max_version)
+    member_sections = rules['member_sections']
+    entries = []
+    for section, row_classes, link_classes, url, member_name in records:
+        if section not in member_sections or 'el' not in link_classes:
+            continue
+        entry_type, skip_inherited = member_sections[section]
+        # Do not consider inherited members
+        if skip_inherited and 'inherit' in row_classes:
+            continue
+        if url and rewrite:
+            url = rewrite_link('a', url)
+        url = url or ''
+        for old, new in rules['member_url_replacements']:
+            url = url.replace(old, new)
+        if member_name and url:
+            entries.append(('{0}::{1}'.format(class_name, member_name), entry_type, url))
+    return entries
+
+
+def get_base_pages(records):
+    """
+    Returns the pages of the classes that a class inherits members from, given
+    the records extracted from its page. Doxygen lists the members inherited
+    from each base class, direct or not, in rows whose classes are ``inherit``
+    and the section followed by the page of the base class, e.g.
+    ``inherit pub_methods_class_animatable``.
+
+    :param records: ``list`` of ``(section, row_classes, link_classes, url, name)``
+        records, one per member listed in the page.
+
+    :return: ``list`` of the names of the pages, in the order they are listed.
+    """
+    bases = []
+    for section, row_classes, _, _, _ in records:
+        if not section or not row_classes or 'inherit' not in row_classes:
+            continue
+        prefix = section.replace('-', '_') + '_'
+        for row_class in row_classes:
+            if row_class.startswith(prefix) and len(row_class) > len(prefix):
+                page = row_class[len(prefix):] + '.html'
+                if page not in bases:
+                    bases.append(page)
+    return bases
+
+
+def is_dead_script(src, contents=''):
+    """
+    Returns ``True`` if the script with the source or inline contents given is
+    not used in the docset.
+    """
+    if src and (src.startswith('http://') or src.startswith('https://') or src.startswith('//')):
+        return True
+    return any(pattern in (src or '') or pattern in contents for pattern in DEAD_SCRIPT_PATTERNS)
+
+
+def get_anchor_name(member_text, logger=None):
+    """
+    Returns the name of the Dash anchor to insert for a ``memname`` cell, given
+    the text that ends the cell (e.g. ``* Animatable::GetReference ``).
+
+    :return: ``str`` name of the anchor, or ``None`` if the member name could
+        not be determined.
+    """
+    if not member_text or len(member_text) <= 2:
+        return None
+    member_name_components = member_text.split(' ')
+    if len(member_name_components) < 2:
+        (logger or logging.getLogger(__name__)).warning('Skipped member: {0}!'.format(member_text))
+        return None
+    return '//apple_ref/cpp/Function/{0}'.format(member_name_components[-2])
+
+
+def decode_name(mangled):
+    """
+    Returns the name of the symbol that Doxygen mangled into the name of a page.
+
+    >>> decode_name('_max_s_d_k_1_1_i_node')
+    'MaxSDK::INode'
+    >>> decode_name('_i_param_block2___base')
+    'IParamBlock2_Base'
+    >>> decode_name('_i_tab_3_01_t_01_4')
+    'ITab< T >'
+
+    :param mangled: ``str`` mangled name, e.g. the name of a class page without
+        its ``class`` prefix and extension.
+
+    :return: ``str`` name of the symbol.
+    """
+    return MANGLED_RE.sub(lambda match: match.group(1) if match.group(1) == '_' else
+                          ESCAPED_CHARACTERS.get(match.group(1)) or match.group(1).upper(), mangled)
+
+
+def get_title(name, separator=''):
+    """Returns the readable title of a page that is not named after a symbol, e.g. a header file."""
+    return separator.join([a[0].upper() + a[1:] for a in name.split('_') if a])
+
+
+def get_page_entry(filename):
+    """
+    Returns the search index entry for the documentation page given, derived
+    from its filename.
+
+    :param filename: ``str`` name of the HTML documentation page.
+
+    :return: ``tuple`` of ``(name, type, path)``, or ``None`` if the page is not
+        indexed.
+    """
+    if not filename.endswith('.html') or '-members' in filename:
+        return None
+    page_name = filename[:-5]
+    for pattern, entry_type, get_name in PAGE_PATTERNS:
+        match = pattern.match(page_name)
+        if match:
+            return (get_name(match.group('name')), entry_type, filename)
+    return None
+
+
+def get_member_briefs(page):
+    """
+    Returns the brief descriptions of the members listed in the class page given.
+
+    :param page: ``str`` contents of the HTML page, formatted or not.
+
+    :return: ``dict`` mapping the anchor of each member to its brief description
+        as plain text.
+    """
+    briefs = {}
+    for anchor, brief in MEMBER_BRIEF_RE.findall(page):
+        brief = html.unescape(TAG_RE.sub('', MORE_LINK_RE.sub('', brief)))
+        brief = ' '.join(brief.split())
+        if brief:
+            briefs[anchor] = brief
+    return briefs
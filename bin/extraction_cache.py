@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+This module contains the extraction cache that is used to regenerate the search
+index without parsing the documentation again. The member records extracted
+from each class page only depend on the contents of the page, so they are
+stored against its content hash, and the rules that turn them into search index
+entries are applied each time the index is written.
+"""
+import logging
+from doxygen import EXTRACTOR_VERSION
+from lib import get_sidecar_path, load_json, save_json
+
+
+EXTRACTION_CACHE_NAME = '.extractionCache.json'
+
+
+def get_extraction_cache_path(output_path):
+    """
+    Returns the path to the extraction cache for the given output (either the
+    ``Documents`` directory or the database file).
+    """
+    return get_sidecar_path(output_path, EXTRACTION_CACHE_NAME)
+
+
+class ExtractionCache(object):
+    """
+    This class is the persistent store of the member records extracted from the
+    class pages, keyed by the content hash of each page.
+
+    :param path: ``str`` path to the cache file.
+
+    :param version: ``int`` version of the extractor the records are for. If it
+        does not match the version stored in the cache, all records are discarded.
+    """
+    def __init__(self, path, version=EXTRACTOR_VERSION):
+        self.path = path
+        self.version = version
+        self.pages = {}
+        self._dirty = False
+        self.logger = logging.getLogger(__name__)
+        self.load()
+
+    def load(self):
+        """Reads the records from disk, if they are still valid."""
+        self.pages = {}
+        self._dirty = False
+        data = load_json(self.path, 'extraction cache')
+        if data is None:
+            return
+        if data.get('version') != self.version:
+            self.logger.debug('The extraction cache is out of date, ignoring it!')
+            self._dirty = True
+            return
+        self.pages = data.get('pages', {})
+
+    def save(self, keep=None):
+        """
+        Writes the records to disk.
+
+        :param keep: ``set`` of the content hashes of the pages that still exist.
+            If given, the records of all other pages are discarded.
+        """
+        if keep is not None:
+            stale = [digest for digest in self.pages if digest not in keep]
+            for digest in stale:
+                del self.pages[digest]
+            self._dirty = self._dirty or bool(stale)
+        if not self._dirty:
+            return
+        save_json(self.path, {'version': self.version, 'pages': self.pages})
+        self._dirty = False
+
+    def get(self, digest):
+        """
+        Returns the records of the page with the content hash given.
+
+        :return: ``list`` of ``(section, row_classes, link_classes, url, name)``
+            records, or ``None`` if the page is not in the cache.
+        """
+        records = self.pages.get(digest) if digest else None
+        if records is None:
+            return None
+        return [tuple(record) for record in records]
+
+    def put(self, digest, records):
+        """Stores the records of the page with the content hash given."""
+        if digest:
+            self.pages[digest] = [list(record) for record in records]
+            self._dirty = True
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+"""
+This module is a script that generates a synthetic copy of the 3ds max Doxygen
+documentation, so that the build can be measured without downloading the
+reference from Autodesk. The pages mimic the shapes the build relies on: class
+pages with ``groupheader`` sections, ``memItemRight`` rows and ``memname``
+cells, along with member lists, structs, namespaces, modules, headers, unions
+and examples, plus the ``style`` and ``scripts`` directories.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+
+
+WORDS = ['anim', 'bitmap', 'block', 'bone', 'camera', 'channel', 'class', 'control',
+         'curve', 'desc', 'dialog', 'face', 'geom', 'graph', 'helper', 'interface',
+         'key', 'layer', 'light', 'list', 'map', 'material', 'matrix', 'mesh', 'modifier',
+         'node', 'object', 'param', 'patch', 'point', 'poly', 'ref', 'render', 'scene',
+         'shader', 'shape', 'spline', 'target', 'texture', 'track', 'tree', 'value',
+         'vertex', 'view', 'weight', 'xref']
+
+# NOTE: The share of each kind of page in the Autodesk reference, roughly.
+PAGE_KINDS = [
+    ('class', 0.40),
+    ('struct', 0.10),
+    ('namespace', 0.02),
+    ('group', 0.05),
+    ('header', 0.30),
+    ('example', 0.03),
+    ('union', 0.02),
+    ('page', 0.08),
+]
+
+HEADER = '''<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head>
+<meta http-equiv="Content-Type" content="text/xhtml;charset=UTF-8"/>
+<title>3ds Max C++ API Reference: {title}</title>
+<link href="style/tabs.css" rel="stylesheet" type="text/css"/>
+<link href="style/doxygen.css" rel="stylesheet" type="text/css"/>
+<script type="text/javascript" src="../scripts/jquery.js"></script>
+<script type="text/javascript" src="../scripts/dynsections.js"></script>
+<script type="text/javascript" src="http://www.microsofttranslator.com/ajax/v3/WidgetV3.ashx?siteData=abc"></script>
+<script type="text/javascript">
+  $(document).ready(function() {{ if (window.location.hash.length > 0 && $(".memitem").length < 5000) {{ initNavTree(); }} }});
+</script>
+</head>
+<body>
+<div id="top">
+<div id="titlearea"><img alt="Logo" src="cpp_ref/autodesk_logo.png"/></div>
+<div id="navrow1" class="tabs">
+<ul class="tablist">
+<li><a href="#!/url=./cpp_ref/index.html"><span>Main&#160;Page</span></a></li>
+<li><a href="#!/url=./cpp_ref/modules.html"><span>Modules</span></a></li>
+<li class="current"><a href="#!/url=./cpp_ref/annotated.html"><span>Classes</span></a></li>
+<li><a href="#!/url=./cpp_ref/files.html"><span>Files</span></a></li>
+</ul>
+</div>
+</div>
+<div class="header"><div class="headertitle"><div class="title">{title}</div></div></div>
+<div class="contents">
+'''
+
+FOOTER = '''</div>
+<hr class="footer"/><address class="footer"><small>Generated by <img class="footer" src="cpp_ref/doxygen.png" alt="doxygen"/></small></address>
+</body>
+</html>
+'''
+
+SECTIONS = [
+    ('pub-types', 'Public Types'),
+    ('pub-methods', 'Public Member Functions'),
+    ('pub-static-methods', 'Static Public Member Functions'),
+    ('pro-methods', 'Protected Member Functions'),
+    ('pub-attribs', 'Public Attributes'),
+]
+
+
+def mangle_name(name):
+    """
+    Returns the name of a symbol mangled the way Doxygen names its pages,
+    e.g. ``MaxSDK::INode`` becomes ``max_s_d_k_1_1_i_node``.
+    """
+    result = []
+    for c in name.replace('::', '\x00'):
+        if c == '\x00':
+            result.append('_1_1')
+        elif c == '_':
+            result.append('__')
+        elif c.isupper():
+            result.append('_' + c.lower())
+        else:
+            result.append(c)
+    return ''.join(result).lstrip('_')
+
+
+def make_symbol(rng, num_words=None):
+    """Returns a random CamelCase symbol name."""
+    num_words = num_words or rng.randint(1, 3)
+    name = ''.join([rng.choice(WORDS).capitalize() for _ in range(num_words)])
+    if rng.random() < 0.15:
+        name = 'I' + name
+    return name
+
+
+def get_num_members(rng, size_scale):
+    """
+    Returns the number of members of a class. Most classes are small but a few
+    are huge, like ``Animatable`` or ``INode`` in the real reference.
+    """
+    return max(1, int(rng.lognormvariate(3.0, 1.0) * size_scale))
+
+
+def make_class_page(rng, class_name, filename, bases, num_members):
+    """Returns the HTML of a class page with the given number of members."""
+    lines = [HEADER.format(title='{0} Class Reference'.format(class_name))]
+    lines.append('<p><a href="#!/url=./cpp_ref/{0}">List of all members.</a></p>\n'.format(
+        filename.replace('.html', '-members.html')))
+    members = []
+    for section, title in SECTIONS:
+        lines.append('<table class="memberdecls">\n')
+        lines.append('<tr class="heading"><td colspan="2"><h2 class="groupheader">'
+                     '<a name="{0}"></a>\n{1}</h2></td></tr>\n'.format(section, title))
+        for i in range(max(1, num_members // len(SECTIONS) + rng.randint(-2, 2))):
+            member = make_symbol(rng)
+            anchor = 'a{0:032x}'.format(rng.getrandbits(128))
+            members.append((member, anchor))
+            return_type = rng.choice(['int', 'void', 'bool', 'float', 'TSTR'])
+            lines.append('<tr class="memitem:{0}"><td class="memItemLeft" align="right" valign="top">'
+                         '{1}&#160;</td><td class="memItemRight" valign="bottom">'
+                         '<a class="el" href="#!/url=./cpp_ref/{2}#{0}">{3}</a> (int i, const '
+                         '<a class="el" href="#!/url=./cpp_ref/class_point3.html">Point3</a> &amp;p)</td></tr>\n'
+                         .format(anchor, return_type, filename, member))
+            lines.append('<tr class="memdesc:{0}"><td class="mdescLeft">&#160;</td><td class="mdescRight">'
+                         'Gets the {1} of the object. <a href="#{0}">More...</a><br/></td></tr>\n'
+                         .format(anchor, member.lower()))
+            lines.append('<tr class="separator:{0}"><td class="memSeparator" colspan="2">&#160;</td></tr>\n'
+                         .format(anchor))
+        for base in bases:
+            base_member = make_symbol(rng)
+            lines.append('<tr class="inherit {0}_{1}"><td class="memItemLeft" align="right" valign="top">'
+                         'int&#160;</td><td class="memItemRight" valign="bottom">'
+                         '<a class="el" href="#!/url=./cpp_ref/{1}.html#a0">{2}</a> ()</td></tr>\n'
+                         .format(section.replace('-', '_'), base, base_member))
+        lines.append('</table>\n')
+    lines.append('<h2 class="groupheader">Member Function Documentation</h2>\n')
+    for member, anchor in members:
+        lines.append('<a class="anchor" id="{0}"></a>\n<div class="memitem">\n<div class="memproto">\n'
+                     '<table class="memname">\n<tr>\n<td class="memname">virtual '
+                     '<a class="el" href="#!/url=./cpp_ref/class_point3.html">Point3</a> {1}::{2} </td>\n'
+                     '<td>(</td><td class="paramtype">int&#160;</td><td class="paramname"><em>i</em></td><td>)</td>\n'
+                     '</tr>\n</table>\n</div>\n<div class="memdoc">\n<p>{3}</p>\n</div>\n</div>\n'
+                     .format(anchor, class_name, member, 'Lorem ipsum dolor sit amet. ' * rng.randint(1, 8)))
+    lines.append(FOOTER)
+    return ''.join(lines)
+
+
+def make_simple_page(rng, title, num_paragraphs):
+    """Returns the HTML of a page that is not a class page."""
+    lines = [HEADER.format(title=title)]
+    for _ in range(num_paragraphs):
+        target = 'class_{0}.html'.format(mangle_name(make_symbol(rng)))
+        lines.append('<p>See <a class="el" href="#!/url=./cpp_ref/{0}">here</a>. {1}</p>\n'
+                     .format(target, 'Lorem ipsum dolor sit amet. ' * rng.randint(1, 6)))
+    lines.append(FOOTER)
+    return ''.join(lines)
+
+
+def main(output_path, num_pages=1000, size_scale=1.0, num_images=None, seed=0):
+    """
+    This is the main entry point of the program. It writes a synthetic copy of
+    the documentation, laid out like the Autodesk download, to ``output_path``.
+
+    :param output_path: ``str`` path to write the documentation to. The ``cpp_ref``,
+        ``style`` and ``scripts`` directories are created in it.
+
+    :param num_pages: ``int`` number of HTML pages to generate.
+
+    :param size_scale: ``float`` factor applied to the number of members of each class.
+
+    :param num_images: ``int`` number of images to generate. Defaults to one per
+        four pages.
+
+    :param seed: ``int`` seed of the random generator, so that runs are repeatable.
+
+    :return: ``dict`` describing the generated corpus.
+    """
+    logger = logging.getLogger(__name__)
+    rng = random.Random(seed)
+    docs_path = os.path.join(output_path, 'cpp_ref')
+    if os.path.isdir(output_path):
+        shutil.rmtree(output_path)
+    for d in ('cpp_ref', 'style', 'scripts'):
+        os.makedirs(os.path.join(output_path, d))
+
+    for css in ('tabs.css', 'doxygen.css', 'navtree.css'):
+        with open(os.path.join(output_path, 'style', css), 'w') as f:
+            f.write('.memitem { padding: 0; }\n' * 200)
+    for script in ('jquery.js', 'dynsections.js', 'navtree.js'):
+        with open(os.path.join(output_path, 'scripts', script), 'w') as f:
+            f.write('function f() { return 0; }\n' * 500)
+    num_images = num_pages // 4 if num_images is None else num_images
+    for i in range(num_images):
+        with open(os.path.join(docs_path, 'image_{0}.png'.format(i)), 'wb') as f:
+            f.write(rng.randbytes(rng.randint(512, 16384)))
+
+    kinds = [k for k, _ in PAGE_KINDS]
+    weights = [w for _, w in PAGE_KINDS]
+    class_files = []
+    num_written = 0
+    total_bytes = 0
+    counts = dict((k, 0) for k in kinds)
+    while num_written < num_pages:
+        kind = rng.choices(kinds, weights)[0]
+        name = make_symbol(rng)
+        if kind == 'class':
+            if rng.random() < 0.1:
+                name = 'MaxSDK::' + name
+            filename = 'class_{0}.html'.format(mangle_name(name))
+            bases = rng.sample(class_files, min(len(class_files), rng.randint(0, 2)))
+            pages = [(filename, make_class_page(rng, name, filename, bases, get_num_members(rng, size_scale))),
+                     (filename.replace('.html', '-members.html'),
+                      make_simple_page(rng, '{0} Member List'.format(name), 20))]
+            class_files.append(os.path.splitext(filename)[0])
+        elif kind == 'struct':
+            pages = [('struct_{0}.html'.format(mangle_name(name)), make_simple_page(rng, name, 10))]
+        elif kind == 'namespace':
+            pages = [('namespace_{0}.html'.format(mangle_name(name)), make_simple_page(rng, name, 30))]
+        elif kind == 'group':
+            pages = [('group___{0}.html'.format(mangle_name(name)), make_simple_page(rng, name, 15))]
+        elif kind == 'header':
+            pages = [('{0}_8h.html'.format(mangle_name(name)), make_simple_page(rng, name, 8))]
+        elif kind == 'example':
+            pages = [('{0}-example.html'.format(mangle_name(name).replace('_', '')), make_simple_page(rng, name, 5))]
+        elif kind == 'union':
+            pages = [('union_{0}.html'.format(mangle_name(name)), make_simple_page(rng, name, 3))]
+        else:
+            pages = [('page_{0}.html'.format(num_written), make_simple_page(rng, name, 10))]
+        for filename, page in pages:
+            if num_written >= num_pages or os.path.isfile(os.path.join(docs_path, filename)):
+                continue
+            with open(os.path.join(docs_path, filename), 'w') as f:
+                f.write(page)
+            num_written += 1
+            total_bytes += len(page)
+            counts[kind] += 1
+
+    corpus = {'path': os.path.abspath(docs_path),
+              'pages': num_written,
+              'images': num_images,
+              'bytes': total_bytes,
+              'kinds': counts,
+              'sizeScale': size_scale,
+              'seed': seed}
+    logger.info('Generated {0} pages ({1} bytes) in: {2}'.format(num_written, total_bytes, docs_path))
+    return corpus
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='This program generates a synthetic copy of the 3ds max Doxygen documentation for benchmarking.')
+    parser.add_argument('-o',
+                        '--output',
+                        type=str,
+                        required=True,
+                        help='The directory on disk where the documentation should be written to.')
+    parser.add_argument('-n',
+                        '--pages',
+                        type=int,
+                        default=1000,
+                        help='The number of HTML pages to generate.')
+    parser.add_argument('-ss',
+                        '--sizeScale',
+                        type=float,
+                        default=1.0,
+                        help='The factor applied to the number of members of each class.')
+    parser.add_argument('-i',
+                        '--images',
+                        type=int,
+                        help='The number of images to generate. Defaults to one per four pages.')
+    parser.add_argument('--seed',
+                        type=int,
+                        default=0,
+                        help='The seed of the random generator.')
+    args = parser.parse_args()
+    print(json.dumps(main(args.output, args.pages, args.sizeScale, args.images, args.seed), indent=2))
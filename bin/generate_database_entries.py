@@ -4,196 +4,53 @@ This module is a command-line utility that writes to the SQLite database that
 is used for lookup of documentation entries.
 """
 import argparse
+import functools
 import logging
 import multiprocessing
 import os
-import sqlite3
-import time
-from bs4 import BeautifulSoup
-from lib import chunk
-
-
-def clean_database(database_file_path):
-    """This clears the database of current search entries."""
-    logger = logging.getLogger(__name__)
-    logger.debug('Making connection to database...')
-    conn = sqlite3.connect(database_file_path)
-    cur = conn.cursor()
-
-    try:
-        logger.debug('Cleaning database...')
-        cur.execute('DROP TABLE searchIndex;')
-    except:
-        logger.warning('Failed to clear out searchIndex! Is this the first time creating the database?')
-    finally:
-        cur.execute('CREATE TABLE searchIndex(id INTEGER PRIMARY KEY, name TEXT, type TEXT, path TEXT);')
-        cur.execute('CREATE UNIQUE INDEX anchor ON searchIndex (name, type, path);')
+import sys
+from build_docset import ENGINES, process_page, process_page_prefetched, read_page
+from catalogue import get_catalogue_path, scan_catalogue
+from class_graph import update_inherited_entries
+from database import DatabaseWriter, clean_database, has_search_index
+from doxygen import get_base_pages, get_member_entries_from_records
+from extraction_cache import ExtractionCache, get_extraction_cache_path
+from lib import get_database_path, run_pipeline, sort_by_size
+from manifest import Manifest, get_manifest_path
+from metrics import BuildMetrics, Stopwatch, get_metrics_path
+from search_index import build_search_tables, drop_search_tables, has_search_text
 
 
 def write_entries(database_file_path,
                   filenames, 
                   docs_sources, 
                   max_version='2017', 
-                  timeout=120.0,
-                  job_id=0):
-    """This function writes search entries to the database."""
-    logging.basicConfig(level=logging.DEBUG)
-    logger = logging.getLogger('write_entries_{0}'.format(job_id))
-    conn = sqlite3.connect(database_file_path, timeout=timeout)
-    cur = conn.cursor()
-    for f in filenames:
-        if os.path.splitext(f)[-1] == '.html':
-            if '-members' in f:
-                continue
-            if f.startswith('class_'):
-                logger.debug('Processing: {0}...'.format(f))
-                class_name = ''
-                name_items = os.path.splitext(f)[0][6:].split('_')
-                for idx, section in enumerate(name_items):
-                    if section:
-                        class_name += section[0].upper() + section[1:]
-                    else:
-                        if not name_items[idx+1]:
-                            class_name += '_'
-                
-                logger.debug('Inserting class_name: {0}'.format(class_name))
-                cur.execute('INSERT OR IGNORE INTO searchIndex(name, type, path)'
-                        ' VALUES (\'{name}\', \'Class\', \'{path}\')'.format(name=class_name, path=f))
-
-                # Now start finding items within the class pages to add
-                # additional entries for
-                html = open(os.path.join(docs_sources, f)).read()
-                soup = BeautifulSoup(html, 'html.parser')
-
-                for h2 in soup.find_all('h2', {'class': 'groupheader'}):
-                    # Now find all public types defined in the class and create
-                    # links to them
-                    if h2.a and h2.a.get('name') == 'pub-types':
-                        items = h2.parent.parent.parent.find_all(
-                            'td',
-                            {'class' : 'memItemRight'}
-                        )
-                        # Do not consider inherited types
-                        for pub_type_item in items:
-                            if 'el' not in pub_type_item.a.get('class'):
-                                continue
-                            if 'inherit' in pub_type_item.parent.get('class'):
-                                continue
-                            type_name = pub_type_item.a.string
-                            type_url = pub_type_item.a.get('href')
-
-                            if max_version == '2017':
-                                type_url = type_url.replace('#!/url=./cpp_ref/', '')
-                            if type_name and type_url:
-                                cur.execute('INSERT OR IGNORE INTO searchIndex(name, type, path)'
-                                        ' VALUES (\'{class_name}::{type_name}\', \'Type\', \'{path}\')'
-                                        .format(class_name=class_name, type_name=type_name, path=type_url))
-                    elif h2.a and h2.a.get('name') == 'pub-methods':
-                        pub_methods = h2.parent.parent.parent.find_all(
-                            'td',
-                            {'class' : 'memItemRight'}
-                        )
-                        # Do not consider inherited functions
-                        for m in pub_methods:
-                            if 'el' not in m.a.get('class'):
-                                continue
-                            if 'inherit' in m.parent.get('class'):
-                                continue
-                            method_name = m.a.string
-                            method_url = m.a.get('href')
-                            # NOTE: For Maya 2017, it seems the URL is
-                            # formatted differently
-                            if max_version == '2017':
-                                method_url = method_url.replace('#!/url=./cpp_ref/', '')
-                            if method_name and method_url:
-                                cur.execute('INSERT OR IGNORE INTO searchIndex(name, type, path)'
-                                        ' VALUES (\'{class_name}::{method_name}\', \'Method\', \'{path}\')'
-                                        .format(class_name=class_name,
-                                                method_name=method_name,
-                                                path=method_url))
-                    elif h2.a and h2.a.get('name') == 'pub-static-methods':
-                        pub_methods = h2.parent.parent.parent.find_all(
-                            'td',
-                            {'class' : 'memItemRight'}
-                        )
-                        # Do not consider inherited functions
-                        for m in pub_methods:
-                            if 'el' not in m.a.get('class'):
-                                continue
-                            if 'inherit' in m.parent.get('class'):
-                                continue
-                            method_name = m.a.string
-                            method_url = m.a.get('href')
-                            # NOTE: For Maya 2017, it seems the URL is
-                            # formatted differently
-                            if max_version == '2017':
-                                method_url = method_url.replace('#!/url=./cpp_ref/', '')
-                            if method_name and method_url:
-                                cur.execute('INSERT OR IGNORE INTO searchIndex(name, type, path)'
-                                        ' VALUES (\'{class_name}::{method_name}\', \'Function\', \'{path}\')'
-                                        .format(class_name=class_name,
-                                                method_name=method_name,
-                                                path=method_url))
-                    elif h2.a and h2.a.get('name') == 'pro-methods':
-                        pub_methods = h2.parent.parent.parent.find_all(
-                            'td',
-                            {'class' : 'memItemRight'}
-                        )
-                        # Do not consider inherited functions
-                        for m in pub_methods:
-                            if 'el' not in m.a.get('class'):
-                                continue
-                            method_name = m.a.string
-                            method_url = m.a.get('href')
-                            if method_name and method_url:
-                                cur.execute('INSERT OR IGNORE INTO searchIndex(name, type, path)'
-                                        ' VALUES (\'{class_name}::{method_name}\', \'Method\', \'{path}\')'
-                                        .format(class_name=class_name,
-                                                method_name=method_name,
-                                                path=method_url))
-
-
-            elif f.startswith('struct_'):
-                struct_name = ''.join([a[0].upper() + a[1:] for a in os.path.splitext(f)[0].split('struct_')[-1].split('_') if a])
-                cur.execute('INSERT OR IGNORE INTO searchIndex(name, type, path)'
-                        ' VALUES (\'{name}\', \'Struct\', \'{path}\')'.format(name=struct_name, path=f))
-
-            elif f.startswith('namespace'):
-                namespace_name = ''.join([a[0].upper() + a[1:] for a in os.path.splitext(f)[0].replace('namespace', '').split('_') if a])
-                cur.execute('INSERT OR IGNORE INTO searchIndex(name, type, path)'
-                        ' VALUES (\'{name}\', \'Namespace\', \'{path}\')'.format(name=namespace_name, path=f))
-
-            elif '-example' in f:
-                example_name = ''.join([a[0].upper() + a[1:] for a in os.path.splitext(f)[0].split('-example')[0].split('_') if a]) + 'Example'
-                cur.execute('INSERT OR IGNORE INTO searchIndex(name, type, path)'
-                        ' VALUES (\'{name}\', \'Sample\', \'{path}\')'.format(name=example_name, path=f))
-            # NOTE (sonictk): Header file documentation
-            elif f.endswith('_8h.html'):
-                header_name = ''.join([a[0].upper() + a[1:] for a in f[0:-8].split('_') if a])
-                cur.execute('INSERT OR IGNORE INTO searchIndex(name, type, path)'
-                        ' VALUES (\'{name}\', \'File\', \'{path}\')'.format(name=header_name, path=f))
-            elif f.startswith('group___'):
-                module_name = ' '.join([a[0].upper() + a[1:] for a in f[8:-5].split('_') if a])
-                cur.execute('INSERT OR IGNORE INTO searchIndex(name, type, path)'
-                        ' VALUES (\'{name}\', \'Module\', \'{path}\')'.format(name=module_name, path=f))
-            elif f.startswith('union_'):
-                union_name = ''.join([a[0].upper() + a[1:] for a in f[6:-5].split('_') if a])
-                cur.execute('INSERT OR IGNORE INTO searchIndex(name, type, path)'
-                        ' VALUES (\'{name}\', \'Union\', \'{path}\')'.format(name=union_name, path=f))
+                  job_id=0,
+                  engine='stream'):
+    """
+    This function writes search entries to the database.
 
-    try: conn.commit()
-    except sqlite3.OperationalError:
-        logger.warning('Encountered database lock, attemping again after 5 seconds...')
-        time.sleep(5)
-        conn.commit()
-    finally:
-        logger.debug('Job {0} complete, closing connection to database...'.format(os.getpid()))
-        conn.close()
+    :return: ``dict`` of the search index entries written for each file.
+    """
+    logger = logging.getLogger('write_entries_{0}'.format(job_id))
+    results = {}
+    with DatabaseWriter(database_file_path) as writer:
+        for f in filenames:
+            results[f] = process_page(f, docs_sources, max_version=max_version, engine=engine, logger=logger)
+            writer.insert(results[f])
+    return results
 
 
-def main(docs_sources, output_path, max_version='2017', multi_thread=False):
+def main(docs_sources, output_path, max_version='2017', multi_thread=False, full=False, jobs=None, engine='stream', metrics_path=None, top=10, search_tables=False, inherited_members=False):
     """
-    This is the main entry point of the program.
+    This is the main entry point of the program. Only the entries of the files
+    that have changed since the last run are updated, unless ``full`` is set.
+
+    The members extracted from each class page are cached against the content
+    hash of the page, so that regenerating the database after the indexing rules
+    have changed replays the cached records instead of parsing the pages again.
+    The base classes of each class page are recorded in the manifest, so that
+    the members each class inherits can be resolved without the cached records.
     
     :param docs_sources: ``str`` path to the formatted documentation sources. This 
         should be the root of the folder that contains the ``index.html`` formatted 
@@ -206,44 +63,116 @@ def main(docs_sources, output_path, max_version='2017', multi_thread=False):
 
     :param max_version: ``str`` indicating what version of 3ds max the docset database
         being generated for is.
+
+    :param full: ``bool`` to indicate if the database should be regenerated from scratch.
+
+    :param jobs: ``int`` number of worker processes to use. Defaults to the
+        number of cores if ``multi_thread`` is enabled.
+
+    :param engine: ``str`` name of the engine used to process the pages; either
+        ``stream`` or ``soup``.
+
+    :param metrics_path: ``str`` path to write the metrics of the run to. Defaults
+        to a file next to the manifest.
+
+    :param top: ``int`` number of the slowest and largest pages to report.
+
+    :param search_tables: ``bool`` to indicate if the prefix index and full-text
+        table used by :mod:`search_index` should be built too.
+
+    :param inherited_members: ``bool`` to indicate if the members each class
+        inherits should be indexed under the name of the class too.
+
+    :return: ``int`` exit code; non-zero if any page failed to be processed.
     """
     logger = logging.getLogger(__name__)
-    database_file_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                                      'max-{0}-cpp.docset'.format(max_version),
-                                      'Contents',
-                                      'Resources',
-                                      'docSet.dsidx')
-    if not os.path.isfile(database_file_path):
-        logger.debug('The database file: {0} does not exist, creating it...'.format(database_file_path))
-        open(database_file_path, 'w').close()
-    # Clean the database of existing entries
-    clean_database(database_file_path)
-    # Write entries
+    database_file_path = output_path or get_database_path(max_version)
     if not docs_sources:
         docs_sources = os.path.join(os.path.dirname(database_file_path), 'Documents')
 
     if not os.path.isdir(docs_sources):
         raise IOError('The documentation directory: {0} does not exist!'.format(docs_sources))
 
-    logger.debug('Inserting entries into database...')
-    all_files = os.listdir(docs_sources)
-    logger.debug('Total number of files to process: {0}'.format(len(all_files)))
+    manifest = Manifest(get_manifest_path(database_file_path),
+                        'index',
+                        {'sources': os.path.abspath(docs_sources), 'maxVersion': max_version, 'inheritedMembers': inherited_members})
+    rebuild = full or not manifest.files or not has_search_index(database_file_path)
+    if rebuild:
+        manifest.clear()
+        manifest.save()
+        # Clean the database of existing entries
+        clean_database(database_file_path)
 
-    if multi_thread:
-        jobs = []
-        for idx, s in enumerate(chunk(all_files, 500)):
-            job = multiprocessing.Process(target=write_entries,
-                    args=(database_file_path, s, docs_sources, max_version, idx))
-            jobs.append(job)
+    logger.debug('Inserting entries into database...')
+    catalogue = scan_catalogue(docs_sources, get_catalogue_path(database_file_path))
+    changed, removed = manifest.diff(docs_sources, catalogue.pages, catalogue.stats)
+    logger.debug('Files changed: {0}, files removed: {1}'.format(len(changed), len(removed)))
+    cache = ExtractionCache(get_extraction_cache_path(database_file_path))
+    results = {}
+    bases = {}
+    pages = []
+    for f in changed:
+        page_entry = catalogue.get_page_entry(f)
+        records = cache.get(manifest.get_hash(f)) if page_entry and page_entry[1] == 'Class' else None
+        if records is None:
+            pages.append(f)
+        else:
+            results[f] = [page_entry] + get_member_entries_from_records(records, page_entry[0], max_version)
+            bases[f] = get_base_pages(records)
+    logger.info('Replaying {0} pages from the extraction cache'.format(len(results)))
+    pages = sort_by_size(docs_sources, pages, catalogue.sizes)
+    jobs = jobs or (multiprocessing.cpu_count() if multi_thread else 1)
+    logger.debug('Total number of files to process: {0} with {1} jobs'.format(len(pages), jobs))
+    failed = set()
+    run_metrics = BuildMetrics(jobs)
+    with DatabaseWriter(database_file_path, rebuild=rebuild) as writer:
+        # Remove the entries of the files that have changed; they will be written again
+        [writer.delete(manifest.get(f, 'entries', []) + manifest.get(f, 'inherited', [])) for f in removed + changed]
+        writer.flush()
+        [manifest.remove(f) for f in removed]
+        [writer.insert(entries) for entries in results.values()]
+        for f, result, error in run_pipeline(process_page_prefetched,
+                                             pages,
+                                             functools.partial(read_page, docs_sources=docs_sources, index_only=True, catalogue=catalogue),
+                                             None,
+                                             (docs_sources, None, max_version, True, engine),
+                                             jobs):
+            if error:
+                logger.error('Failed to process: {0}!\n{1}'.format(f, error))
+                failed.add(f)
+                continue
+            entries, records, page_metrics, _ = result
+            page_entry = catalogue.get_page_entry(f)
+            if page_entry and page_entry[1] == 'Class':
+                cache.put(manifest.get_hash(f), records)
+                bases[f] = get_base_pages(records)
+            watch = Stopwatch(page_metrics)
+            writer.insert(entries)
+            watch.lap('insert')
+            run_metrics.add_page(f, page_metrics)
+            results[f] = entries
+    run_metrics.finish()
+
+    for f in changed:
+        if f not in failed:
+            manifest.commit(f, entries=results.get(f, []), bases=bases.get(f, []))
+    if inherited_members and (changed or removed):
+        update_inherited_entries(database_file_path, manifest, failed)
+    manifest.save()
+    if search_tables and (changed or removed or not has_search_text(database_file_path)):
+        build_search_tables(database_file_path, docs_sources)
+    elif not search_tables:
+        drop_search_tables(database_file_path)
+    cache.save(set(record.get('hash') for record in manifest.files.values()))
+    run_metrics.write(metrics_path or get_metrics_path(database_file_path, 'index'), top)
+    run_metrics.log_summary(logger, top)
+    if failed:
+        logger.error('Failed to process {0} pages!'.format(len(failed)))
+        return 1
+    return 0
 
-        logger.debug('Num. of jobs scheduled: {0}'.format(len(jobs)))
-        [j.start() for j in jobs]
-        logger.info('Jobs submitted, please wait for them to complete!')
-    else:
-        write_entries(database_file_path, all_files, docs_sources, max_version)
 
 if __name__ == '__main__':
-    logging.basicConfig(level=logging.DEBUG)
     parser = argparse.ArgumentParser(description='This program generates the database entries for the docset.')
     parser.add_argument('-s',
                         '--sources',
@@ -259,8 +188,42 @@ if __name__ == '__main__':
                         help='The 3ds max version to generate the docset for.')
     parser.add_argument('-mt',
                         '--multiThread',
-                        default=False,
-                        type=bool,
-                        help='If set to True, will run jobs in parallel. Uses more system resources.')
+                        action='store_true',
+                        help='If set, will run jobs in parallel. Uses more system resources.')
+    parser.add_argument('-j',
+                        '--jobs',
+                        type=int,
+                        help='The number of jobs to run in parallel. Defaults to the number of cores when multi-threading.')
+    parser.add_argument('-e',
+                        '--engine',
+                        choices=ENGINES,
+                        default='stream',
+                        help='The engine used to process the pages. The streaming engine is much faster; BeautifulSoup is kept as a fallback.')
+    parser.add_argument('-f',
+                        '--full',
+                        action='store_true',
+                        help='If set, regenerates the database from scratch instead of only updating the entries of the files that have changed.')
+    parser.add_argument('-m',
+                        '--metrics',
+                        type=str,
+                        help='The path to write the JSON metrics of the run to. Defaults to a file in the .docsetBuild directory next to the docset.')
+    parser.add_argument('-t',
+                        '--top',
+                        type=int,
+                        default=10,
+                        help='The number of the slowest and largest pages to report.')
+    parser.add_argument('-im',
+                        '--inheritedMembers',
+                        action='store_true',
+                        help='If set, also indexes the members each class inherits under the name of the class, e.g. Derived::BaseMethod.')
+    parser.add_argument('-st',
+                        '--searchTables',
+                        action='store_true',
+                        help='If set, also builds the prefix index and full-text table of the entry names and member descriptions used by search_index.py.')
+    parser.add_argument('-v',
+                        '--verbose',
+                        action='store_true',
+                        help='If set, logs every file processed. Slows down the run.')
     args = parser.parse_args()
-    main(args.sources, args.output, args.maxVersion, args.multiThread)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    sys.exit(main(args.sources, args.output, args.maxVersion, args.multiThread, args.full, args.jobs, args.engine, args.metrics, args.top, args.searchTables, args.inheritedMembers))
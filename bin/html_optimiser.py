@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+"""
+This module contains the optional size optimisation pass that is run on the
+formatted pages. It removes the navigation blocks, the scripts that are not
+used in the docset and the comments of each page, collapses the whitespace
+between its tags, and moves its larger inline scripts and styles into shared
+files, so that the blocks repeated on every page are stored only once.
+
+Like :mod:`html_rewriter`, it works on the stream of tags and text of the page
+rather than on a tree.
+"""
+import hashlib
+import os
+import re
+from doxygen import NAV_IDS, is_dead_script
+from html_rewriter import VOID_TAGS, parse_attributes, tokenize
+
+
+SHARED_DIRECTORY = 'shared'
+# NOTE: Inline scripts and styles smaller than this are left in the page, since
+# loading them from a file would cost more than it saves.
+MIN_SHARED_SIZE = 256
+WHITESPACE_RE = re.compile(r'\s*\n\s*|[^\S\n]{2,}|[\t\r\f\v]')
+# NOTE: The contents of these tags are rendered as-is, so their whitespace is kept.
+PREFORMATTED_TAGS = frozenset(['pre', 'textarea'])
+PREFORMATTED_CLASSES = frozenset(['fragment'])
+
+
+def collapse_whitespace(text):
+    """Collapses each run of whitespace to a single newline, or space if it has no newline."""
+    return WHITESPACE_RE.sub(lambda m: '\n' if '\n' in m.group(0) else ' ', text)
+
+
+def get_shared_file(contents, extension):
+    """
+    Returns the path of the shared file for the inline block given, relative to
+    the directory of the page, named after the hash of its contents.
+    """
+    digest = hashlib.sha1(contents.encode('utf-8')).hexdigest()[:16]
+    return '{0}/{1}.{2}'.format(SHARED_DIRECTORY, digest, extension)
+
+
+class PageOptimiser(object):
+    """
+    This class optimises a single formatted page from the stream of events
+    produced by :func:`html_rewriter.tokenize`.
+    """
+    def __init__(self):
+        self.output = []
+        self.shared = {}
+        # NOTE: The name and nesting depth of the element being removed or kept
+        # as-is, if any.
+        self._drop = None
+        self._preformatted = None
+        self._inline = None
+
+    def _enter(self, scope, name):
+        if scope is not None and scope[0] == name:
+            scope[1] += 1
+        return scope
+
+    def _leave(self, scope, name):
+        if scope is not None and scope[0] == name:
+            scope[1] -= 1
+            if not scope[1]:
+                return None, True
+        return scope, False
+
+    def handle_starttag(self, raw, name, attributes_raw):
+        self._drop = self._enter(self._drop, name)
+        self._preformatted = self._enter(self._preformatted, name)
+        if self._drop is not None:
+            return
+        # NOTE: Most tags have neither an id nor a class that matters here, so
+        # their attributes are only parsed if they might.
+        if name not in ('script', 'style') and name not in PREFORMATTED_TAGS and 'id' not in attributes_raw and \
+                (self._preformatted is not None or 'class' not in attributes_raw):
+            self.output.append(raw)
+            return
+        attributes = parse_attributes(attributes_raw)
+        self_closing = name in VOID_TAGS or attributes_raw.rstrip().endswith('/')
+        if name == 'script' and not self_closing:
+            src = attributes.get('src', (None, None))[0]
+            if src and is_dead_script(src):
+                self._drop = [name, 1]
+            elif not src:
+                self._inline = [raw, attributes, []]
+            else:
+                self.output.append(raw)
+            return
+        if name == 'style' and not self_closing:
+            self._inline = [raw, attributes, []]
+            return
+        if not self_closing and attributes.get('id', (None,))[0] in NAV_IDS:
+            self._drop = [name, 1]
+            return
+        if self._preformatted is None and not self_closing and \
+                (name in PREFORMATTED_TAGS or PREFORMATTED_CLASSES & set(attributes.get('class', ('',))[0].split())):
+            self._preformatted = [name, 1]
+        self.output.append(raw)
+
+    def handle_endtag(self, raw, name):
+        self._preformatted, _ = self._leave(self._preformatted, name)
+        self._drop, dropped = self._leave(self._drop, name)
+        if dropped or self._drop is not None:
+            return
+        if self._inline is not None and name in ('script', 'style'):
+            self.end_inline(raw, name)
+            return
+        self.output.append(raw)
+
+    def handle_text(self, raw):
+        if self._drop is not None:
+            return
+        if self._inline is not None:
+            self._inline[2].append(raw)
+        elif self._preformatted is not None:
+            self.output.append(raw)
+        else:
+            text = raw if raw == '\n' else collapse_whitespace(raw)
+            # NOTE: Whitespace left between removed elements is only kept once.
+            if text.isspace() and self.output and self.output[-1][-1:].isspace():
+                return
+            self.output.append(text)
+
+    def handle_other(self, raw):
+        if self._drop is not None:
+            return
+        # NOTE: Comments are removed, except for conditional comments.
+        if raw.startswith('<!--') and not raw.startswith('<!--['):
+            return
+        self.output.append(raw)
+
+    def end_inline(self, raw, name):
+        """Handles the inline script or style that just ended."""
+        start_raw, attributes, text = self._inline
+        self._inline = None
+        contents = ''.join(text)
+        if name == 'script' and is_dead_script(None, contents):
+            return
+        # NOTE: Only the blocks with no attributes other than their type are moved,
+        # so that nothing else about them changes.
+        if len(contents.strip()) < MIN_SHARED_SIZE or set(attributes) - set(['type']):
+            self.output.extend([start_raw, contents, raw])
+            return
+        if name == 'script':
+            shared_file = get_shared_file(contents, 'js')
+            self.output.append('<script type="text/javascript" src="./{0}"></script>'.format(shared_file))
+        else:
+            shared_file = get_shared_file(contents, 'css')
+            self.output.append('<link href="./{0}" rel="stylesheet" type="text/css"/>'.format(shared_file))
+        self.shared[shared_file] = contents
+
+    def feed(self, page):
+        """Processes the page given."""
+        for event in tokenize(page):
+            kind = event[0]
+            if kind == 'text':
+                self.handle_text(event[1])
+            elif kind == 'start':
+                self.handle_starttag(*event[1:])
+            elif kind == 'end':
+                self.handle_endtag(*event[1:])
+            else:
+                self.handle_other(event[1])
+        return self
+
+    def getvalue(self):
+        """Returns the optimised page."""
+        return ''.join(self.output)
+
+
+def optimise_page(page):
+    """
+    Optimises the formatted page given.
+
+    :param page: ``str`` contents of the formatted HTML page.
+
+    :return: ``tuple`` of the optimised page and the ``dict`` of the contents of
+        the shared files it now loads, keyed by their path relative to the page.
+    """
+    optimiser = PageOptimiser().feed(page)
+    return optimiser.getvalue(), optimiser.shared
+
+
+def write_shared_files(output_path, shared):
+    """
+    Writes the shared files given to the output directory, unless they already
+    exist. Since they are named after their contents, an existing file is
+    always up to date.
+    """
+    for relative_path, contents in shared.items():
+        file_path = os.path.join(output_path, relative_path)
+        if os.path.isfile(file_path):
+            continue
+        if not os.path.isdir(os.path.dirname(file_path)):
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        # NOTE: Written to a temporary file first, since several workers may write it.
+        temp_path = '{0}.{1}.tmp'.format(file_path, os.getpid())
+        with open(temp_path, 'w') as f:
+            f.write(contents)
+        os.replace(temp_path, file_path)
+
+
+def prune_shared_files(output_path, referenced):
+    """
+    Removes the shared files in the output directory that no page loads any more.
+
+    :param referenced: ``set`` of the paths of the shared files still loaded by
+        the pages, relative to ``output_path``.
+
+    :return: ``int`` number of files removed.
+    """
+    shared_path = os.path.join(output_path, SHARED_DIRECTORY)
+    if not os.path.isdir(shared_path):
+        return 0
+    num_removed = 0
+    for entry in os.scandir(shared_path):
+        if entry.is_file() and '{0}/{1}'.format(SHARED_DIRECTORY, entry.name) not in referenced:
+            os.remove(entry.path)
+            num_removed += 1
+    if not os.listdir(shared_path):
+        os.rmdir(shared_path)
+    return num_removed
@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+"""
+This module contains the streaming engine used to format the documentation.
+Rather than building a tree of each page like BeautifulSoup does, the page is
+split into a stream of tags and text, and only the attributes that need to be
+rewritten are edited in place. Everything else is copied to the output as-is.
+
+The member records of class pages, from which their search index entries are
+generated, are extracted from the same stream.
+"""
+import html
+import logging
+import re
+from doxygen import LINK_ATTRIBUTES, get_anchor_name, get_member_entries_from_records, rewrite_link
+
+
+TAG_RE = re.compile(r'<(?:!--.*?--|[!?][^>]*|(/?)([a-zA-Z][^\s/>]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*))>', re.S)
+ATTRIBUTE_RE = re.compile(r'([^\s=/>"\']+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+)))?')
+VOID_TAGS = frozenset(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                       'link', 'meta', 'param', 'source', 'track', 'wbr'])
+RAW_TEXT_END_RE = {
+    'script': re.compile(r'</script\s*>', re.I),
+    'style': re.compile(r'</style\s*>', re.I),
+}
+
+
+def tokenize(page):
+    """
+    Splits the page given into a stream of events.
+
+    :param page: ``str`` contents of the HTML page.
+
+    :return: generator yielding ``tuple`` events of either ``('text', raw)``,
+        ``('start', raw, name, attributes_raw)``, ``('end', raw, name)`` or
+        ``('other', raw)`` for comments and declarations. ``raw`` is the text of
+        the page that the event covers, so joining all of them gives back the
+        page unchanged.
+    """
+    pos = 0
+    length = len(page)
+    while pos < length:
+        match = TAG_RE.search(page, pos)
+        if not match:
+            yield ('text', page[pos:])
+            return
+        if match.start() > pos:
+            yield ('text', page[pos:match.start()])
+        pos = match.end()
+        name = match.group(2)
+        if name is None:
+            yield ('other', match.group(0))
+            continue
+        name = name.lower()
+        if match.group(1):
+            yield ('end', match.group(0), name)
+            continue
+        yield ('start', match.group(0), name, match.group(3))
+        # NOTE: The contents of scripts and styles are not markup, so they
+        # are passed through until their closing tag.
+        if name in RAW_TEXT_END_RE and not match.group(3).rstrip().endswith('/'):
+            end = RAW_TEXT_END_RE[name].search(page, pos)
+            end_pos = end.start() if end else length
+            if end_pos > pos:
+                yield ('text', page[pos:end_pos])
+            pos = end_pos
+
+
+def parse_attributes(attributes_raw):
+    """
+    Returns the attributes of a tag, given the raw text that follows its name.
+
+    :return: ``dict`` mapping each attribute name to a ``tuple`` of its decoded
+        value and the span of the raw value in ``attributes_raw`` (or ``None``
+        if the attribute has no value).
+    """
+    attributes = {}
+    for match in ATTRIBUTE_RE.finditer(attributes_raw):
+        for group in (2, 3, 4):
+            if match.group(group) is not None:
+                attributes[match.group(1).lower()] = (html.unescape(match.group(group)), match.span(group))
+                break
+        else:
+            attributes[match.group(1).lower()] = ('', None)
+    return attributes
+
+
+class PageRewriter(object):
+    """
+    This class formats a single page from the stream of events produced by
+    :func:`tokenize`, and optionally extracts the records of the members
+    declared in it.
+
+    :param class_name: ``str`` name of the class the page documents. If ``None``,
+        no members are extracted.
+
+    :param max_version: ``str`` indicating what version of 3ds max the page is from.
+
+    :param rewrite: ``bool`` to indicate if the links of the page should be rewritten
+        and the anchors inserted.
+    """
+    def __init__(self, class_name=None, max_version='2017', rewrite=True, logger=None):
+        self.class_name = class_name
+        self.max_version = max_version
+        self.rewrite = rewrite
+        self.logger = logger or logging.getLogger(__name__)
+        self.output = []
+        self.records = []
+        # Anchor insertion state
+        self._memname_index = None
+        self._memname_has_link = False
+        self._memname_text = ''
+        # Member extraction state
+        self._table_depth = 0
+        self._in_groupheader = False
+        self._groupheader_link_seen = False
+        self._section = None
+        self._section_depth = None
+        self._row_class = []
+        self._item = None
+        self._item_link = None
+        self._item_text = None
+        self._item_children = None
+
+    def handle_starttag(self, raw, name, attributes_raw):
+        attributes = parse_attributes(attributes_raw)
+        if self.rewrite and name in LINK_ATTRIBUTES:
+            raw = self.rewrite_tag(raw, name, attributes_raw, attributes)
+        classes = attributes.get('class', ('', None))[0].split()
+        self.output.append(raw)
+
+        if self._memname_index is not None:
+            self._memname_text = ''
+            if name == 'a':
+                self._memname_has_link = True
+        elif name == 'td' and 'memname' in classes and self.rewrite:
+            self._memname_index = len(self.output)
+            self._memname_has_link = False
+            self._memname_text = ''
+
+        if self.class_name is None:
+            return
+        if self._item_children is not None:
+            self._item_children[-1] += 1
+            if name not in VOID_TAGS and not attributes_raw.rstrip().endswith('/'):
+                self._item_children.append(0)
+            return
+        if name == 'table':
+            self._table_depth += 1
+        elif name == 'h2' and 'groupheader' in classes:
+            self._in_groupheader = True
+            self._groupheader_link_seen = False
+        elif name == 'tr':
+            self._row_class = classes
+        elif name == 'td' and self._section and 'memItemRight' in classes:
+            self._item = self._row_class
+            self._item_link = None
+        elif name == 'a':
+            if self._in_groupheader and not self._groupheader_link_seen:
+                self._groupheader_link_seen = True
+                section = attributes.get('name', (None,))[0]
+                if section:
+                    self._section = section
+                    self._section_depth = self._table_depth
+            elif self._item is not None and self._item_link is None:
+                self._item_link = (classes, attributes.get('href', ('', None))[0])
+                self._item_text = []
+                self._item_children = [0]
+
+    def handle_endtag(self, raw, name):
+        if self._memname_index is not None:
+            if name == 'td':
+                self.insert_anchor()
+            else:
+                self._memname_text = ''
+        self.output.append(raw)
+
+        if self.class_name is None:
+            return
+        if self._item_children is not None:
+            if name == 'td':
+                # NOTE: The link was never closed.
+                self.end_member_link()
+            elif name == 'a' and len(self._item_children) == 1:
+                self.end_member_link()
+                return
+            else:
+                if len(self._item_children) > 1 and self._item_children.pop() != 1:
+                    self._item_text = None
+                return
+        if name == 'table':
+            if self._section and self._table_depth == self._section_depth:
+                self._section = None
+            self._table_depth -= 1
+        elif name == 'h2':
+            self._in_groupheader = False
+        elif name == 'td' and self._item is not None:
+            self.add_member()
+            self._item = None
+
+    def handle_text(self, raw):
+        self.output.append(raw)
+        if self._memname_index is not None:
+            self._memname_text = html.unescape(raw)
+        if self._item_children is not None:
+            self._item_children[-1] += 1
+            if self._item_text is not None:
+                self._item_text.append(raw)
+
+    def handle_other(self, raw):
+        self.output.append(raw)
+        if self._memname_index is not None and not raw.startswith('<!--'):
+            # NOTE: Comments are not part of the name of the member.
+            self._memname_text = ''
+        if self._item_children is not None:
+            self._item_children[-1] += 1
+            self._item_text = None
+
+    def rewrite_tag(self, raw, name, attributes_raw, attributes):
+        """Returns the raw start tag given with its link rewritten."""
+        url, span = attributes.get(LINK_ATTRIBUTES[name], ('', None))
+        if not url or span is None:
+            return raw
+        new_url = rewrite_link(name, url)
+        if new_url == url:
+            return raw
+        start, end = span
+        # NOTE: Unquoted values are quoted so that the escaped value stays valid.
+        quote = '' if attributes_raw[start - 1:start] in ('"', '\'') else '"'
+        offset = len(raw) - len(attributes_raw) - 1
+        return raw[:offset + start] + quote + html.escape(new_url) + quote + raw[offset + end:]
+
+    def insert_anchor(self):
+        """Inserts the Dash anchor at the start of the ``memname`` cell that just ended."""
+        if self._memname_has_link:
+            anchor_name = get_anchor_name(self._memname_text, self.logger)
+            if anchor_name:
+                self.output.insert(self._memname_index,
+                                   '<a class="dashAnchor" name="{0}"></a>'.format(html.escape(anchor_name)))
+        self._memname_index = None
+
+    def end_member_link(self):
+        """
+        Records the name of the member link that just ended. Like BeautifulSoup's
+        ``Tag.string``, the name is only used if the link contains a single
+        string, possibly nested in tags that each have a single child.
+        """
+        if self._item_children[0] != 1:
+            self._item_text = None
+        name = html.unescape(''.join(self._item_text)) if self._item_text is not None else None
+        self._item_link = self._item_link + (name,)
+        self._item_text = None
+        self._item_children = None
+
+    def add_member(self):
+        """Records the member cell that just ended."""
+        if not self._item_link or len(self._item_link) < 3:
+            return
+        link_classes, url, member_name = self._item_link
+        self.records.append((self._section, self._item, link_classes, url, member_name))
+
+    @property
+    def entries(self):
+        """Returns the search index entries of the members recorded."""
+        return get_member_entries_from_records(self.records, self.class_name, self.max_version, self.rewrite)
+
+    def feed(self, page):
+        """Processes the page given."""
+        for event in tokenize(page):
+            kind = event[0]
+            if kind == 'text':
+                self.handle_text(event[1])
+            elif kind == 'start':
+                self.handle_starttag(*event[1:])
+            elif kind == 'end':
+                self.handle_endtag(*event[1:])
+            else:
+                self.handle_other(event[1])
+        return self
+
+    def getvalue(self):
+        """Returns the formatted page."""
+        return ''.join(self.output)
+
+
+def rewrite_page(page, class_name=None, max_version='2017', rewrite=True, logger=None):
+    """
+    Formats the page given with the streaming engine.
+
+    :param page: ``str`` contents of the HTML page.
+
+    :param class_name: ``str`` name of the class the page documents, if the
+        search index entries of its members should be extracted.
+
+    :param max_version: ``str`` indicating what version of 3ds max the page is from.
+
+    :param rewrite: ``bool`` to indicate if the links of the page should be rewritten
+        and the anchors inserted.
+
+    :return: ``tuple`` of the formatted page and the ``list`` of ``(name, type, path)``
+        search index entries of the members of the class.
+    """
+    rewriter = PageRewriter(class_name, max_version, rewrite, logger).feed(page)
+    return rewriter.getvalue(), rewriter.entries
@@ -2,5 +2,312 @@
 """
 This module contains useful functions that are used by the generation scripts.
 """
-def chunk(l, n):
-    return [l[i:i+n] for i in range(0, len(l), n)]
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# NOTE: The number of threads reading the pages ahead of the workers, and of
+# threads writing their results, in :func:`run_pipeline`.
+IO_THREADS = 4
+DOCSET_EXTENSION = '.docset'
+# NOTE: The directory next to the docsets that the files kept between builds
+# are written to, see :func:`get_sidecar_path`.
+BUILD_CACHE_NAME = '.docsetBuild'
+
+
+def get_docset_path(max_version='2017'):
+    """
+    Returns the default location of the docset for the given version of 3ds max.
+
+    :param max_version: ``str`` indicating what version of 3ds max the docset is for.
+
+    :return: ``str`` path to the ``.docset`` bundle.
+    """
+    return os.path.join(ROOT_PATH, 'max-{0}-cpp.docset'.format(max_version))
+
+
+def get_documents_path(max_version='2017'):
+    """
+    Returns the default location of the formatted HTML documentation in the docset.
+    """
+    return os.path.join(get_docset_path(max_version), 'Contents', 'Resources', 'Documents')
+
+
+def get_database_path(max_version='2017'):
+    """
+    Returns the default location of the search index database in the docset.
+    """
+    return os.path.join(get_docset_path(max_version), 'Contents', 'Resources', 'docSet.dsidx')
+
+
+def get_sources_path(max_version='2017'):
+    """
+    Returns the default location of the original ``cpp_ref`` documentation sources.
+    """
+    return os.path.join(ROOT_PATH, 'resources', max_version, 'cpp_ref')
+
+
+def get_sidecar_path(output_path, name):
+    """
+    Returns the path to a file kept for the next build of the given output
+    (either the ``Documents`` directory or the database file), such as the
+    build manifest.
+
+    These files are only read by the build and record the absolute paths of the
+    sources, so they are kept out of the bundle, in a ``.docsetBuild`` directory
+    next to it, under the name of the docset (e.g.
+    ``.docsetBuild/max-2017-cpp/.buildManifest.json``), so that the docsets of
+    several versions can be built side by side. If the output is not in a
+    ``.docset`` bundle, they are written next to it.
+
+    :param name: ``str`` name of the file.
+    """
+    output_path = os.path.abspath(output_path)
+    path = output_path
+    while os.path.dirname(path) != path:
+        if path.endswith(DOCSET_EXTENSION):
+            return os.path.join(os.path.dirname(path), BUILD_CACHE_NAME,
+                                os.path.basename(path)[:-len(DOCSET_EXTENSION)], name)
+        path = os.path.dirname(path)
+    return os.path.join(os.path.dirname(output_path), name)
+
+
+def load_json(path, description=None):
+    """
+    Reads the JSON file given, such as the build manifest.
+
+    :param description: ``str`` description of the file, used to warn that it
+        is corrupt. If ``None``, no warning is logged, e.g. when the file is
+        about to be written again.
+
+    :return: the data of the file, or ``None`` if it does not exist or is corrupt.
+    """
+    if not path or not os.path.isfile(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except ValueError:
+        if description:
+            logging.getLogger(__name__).warning('The {0}: {1} is corrupt, ignoring it!'.format(description, path))
+        return None
+
+
+def save_json(path, data, indent=None):
+    """
+    Writes the data given to a JSON file. It is written to a temporary file
+    first, so that the file is never left half-written if the build is stopped.
+    """
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=indent, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def sort_by_size(docs_sources, filenames, sizes=None):
+    """
+    Returns the files given sorted from largest to smallest, so that the largest
+    pages are scheduled first and do not leave a single worker running at the
+    end of a build.
+
+    :param sizes: ``dict`` mapping the name of each file to its size, e.g.
+        :attr:`catalogue.Catalogue.sizes`. Otherwise the files are stat'ed.
+    """
+    if sizes is not None:
+        return sorted(filenames, key=sizes.__getitem__, reverse=True)
+    return sorted(filenames, key=lambda f: os.path.getsize(os.path.join(docs_sources, f)), reverse=True)
+
+
+def _init_worker(level):
+    logging.basicConfig(level=level)
+
+
+def _run_job(job):
+    func, filename, args = job
+    try:
+        return filename, func(filename, *args), None
+    except Exception:
+        return filename, None, traceback.format_exc()
+
+
+def create_pool(jobs):
+    """
+    Returns a pool of ``jobs`` worker processes that log at the same level as
+    this process, so that per-file logging stays off unless it has been asked for.
+    """
+    return multiprocessing.Pool(jobs,
+                                initializer=_init_worker,
+                                initargs=(logging.getLogger().getEffectiveLevel(),))
+
+
+def run_jobs(func, filenames, args=(), jobs=1, pool=None):
+    """
+    Runs ``func(filename, *args)`` for each of the files given, on a pool of
+    ``jobs`` worker processes. Files are handed out one at a time in the order
+    given, so that each worker picks up the next file as soon as it is free.
+
+    :param func: ``function`` to run. Must be importable by the worker processes.
+
+    :param filenames: ``list`` of the files to process.
+
+    :param args: ``tuple`` of additional arguments to pass to ``func``.
+
+    :param jobs: ``int`` number of worker processes to use. If ``1``, the files
+        are processed serially in the current process.
+
+    :param pool: ``multiprocessing.Pool`` to run the jobs on, e.g. one that is
+        shared between several runs. It is left open once the jobs are done. If
+        ``None``, a pool of ``jobs`` workers is created for this run.
+
+    :return: generator yielding a ``tuple`` of the filename, the result of
+        ``func`` and the formatted traceback if ``func`` raised an exception
+        (otherwise ``None``) for each file, in order of completion.
+    """
+    work = [(func, f, args) for f in filenames]
+    if pool is not None:
+        for result in pool.imap_unordered(_run_job, work, chunksize=1):
+            yield result
+        return
+    if jobs <= 1 or len(work) <= 1:
+        for job in work:
+            yield _run_job(job)
+        return
+    pool = create_pool(min(jobs, len(work)))
+    try:
+        for result in pool.imap_unordered(_run_job, work, chunksize=1):
+            yield result
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def _run_write(write, filename, result):
+    try:
+        return filename, write(filename, result), None
+    except Exception:
+        return filename, None, traceback.format_exc()
+
+
+def run_pipeline(func, filenames, read, write=None, args=(), jobs=1, pool=None, threads=IO_THREADS, depth=None):
+    """
+    Runs ``func(filename, data, *args)`` for each of the files given, like
+    :func:`run_jobs`, overlapping the input and output of the files with their
+    processing. The data of each file is read by ``read(filename)`` on a pool
+    of threads ahead of the workers, and the result of each file is handed to
+    ``write(filename, result)`` on another pool of threads, so that the workers
+    never wait for the disk.
+
+    At most ``depth`` files are in flight at once, from the moment they are read
+    until they are written, so that memory use stays bounded however far the
+    reads get ahead of the workers. The files are taken from ``filenames`` only
+    as there is room for them, so it may be a lazy iterator.
+
+    :param read: ``function`` that returns the data of a file. It runs in this
+        process, so it does not need to be importable by the workers.
+
+    :param write: ``function`` that writes the result of a file and returns
+        the result to yield for it. If ``None``, the results are yielded as-is.
+
+    :param threads: ``int`` number of threads reading, and of threads writing, the files.
+
+    :param depth: ``int`` maximum number of files in flight. Defaults to twice
+        the number of workers and threads.
+
+    :return: generator yielding a ``tuple`` of the filename, the result and the
+        formatted traceback if reading, processing or writing the file raised an
+        exception (otherwise ``None``) for each file, in order of completion.
+    """
+    depth = depth or 2 * (jobs + threads)
+    num_files = len(filenames) if hasattr(filenames, '__len__') else None
+    pending = iter(filenames)
+    events = queue.Queue()
+    readers = ThreadPoolExecutor(threads)
+    writers = ThreadPoolExecutor(threads)
+    own_pool = None
+    if pool is None and jobs > 1 and (num_files is None or num_files > 1):
+        pool = own_pool = create_pool(min(jobs, num_files or jobs))
+
+    # NOTE: Set once the results are no longer consumed, so that the files still
+    # in flight are dropped rather than handed to the workers or written.
+    closed = threading.Event()
+
+    def on_processed(result):
+        filename, result, error = result
+        if error is not None or write is None:
+            events.put(('done', (filename, result, error)))
+            return
+        try:
+            writers.submit(_run_write, write, filename, result).add_done_callback(
+                lambda future: events.put(('done', future.result())))
+        except RuntimeError:
+            if not closed.is_set():
+                raise
+
+    def on_failed(filename, error):
+        # NOTE: The pool calls this when the result of a job cannot be sent
+        # back, e.g. if it cannot be pickled, which would otherwise drop it.
+        formatted_error = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+        events.put(('done', (filename, None, formatted_error)))
+
+    def on_read(filename, future):
+        if closed.is_set():
+            return
+        try:
+            data = future.result()
+        except Exception:
+            events.put(('done', (filename, None, traceback.format_exc())))
+            return
+        job = (func, filename, (data,) + tuple(args))
+        if pool is None:
+            # NOTE: Without workers, the files are processed by the thread consuming the results.
+            events.put(('read', job))
+        else:
+            pool.apply_async(_run_job, (job,), callback=on_processed,
+                             error_callback=lambda error: on_failed(filename, error))
+
+    def start_next():
+        """Starts reading the next file, and returns ``False`` if there is none left."""
+        for filename in pending:
+            readers.submit(read, filename).add_done_callback(lambda future: on_read(filename, future))
+            return True
+        return False
+
+    in_flight = 0
+    try:
+        while in_flight < depth and start_next():
+            in_flight += 1
+        while in_flight:
+            kind, value = events.get()
+            if kind == 'read':
+                on_processed(_run_job(value))
+                continue
+            in_flight -= 1
+            if start_next():
+                in_flight += 1
+            yield value
+        if own_pool is not None:
+            own_pool.close()
+    except:
+        closed.set()
+        readers.shutdown(cancel_futures=True)
+        if own_pool is not None:
+            own_pool.terminate()
+        raise
+    finally:
+        closed.set()
+        readers.shutdown()
+        writers.shutdown()
+        if own_pool is not None:
+            own_pool.join()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+This module contains the build manifest that is used to rebuild the docset
+incrementally. The manifest records the size, modification time and content
+hash of every source file processed, so that a rebuild only has to process the
+files that have changed since the last build.
+"""
+import hashlib
+import os
+from lib import get_sidecar_path, load_json, save_json
+from stat import S_ISREG
+
+
+MANIFEST_VERSION = 1
+MANIFEST_NAME = '.buildManifest.json'
+
+
+def hash_file(file_path, block_size=1 << 20):
+    """
+    Returns the SHA-1 hex digest of the contents of the file given.
+    """
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_manifest_path(output_path):
+    """
+    Returns the path to the manifest for the given output (either the
+    ``Documents`` directory or the database file).
+    """
+    return get_sidecar_path(output_path, MANIFEST_NAME)
+
+
+class Manifest(object):
+    """
+    This class is the persistent record of the source files that a build stage
+    has processed. Each stage (e.g. ``format`` or ``index``) is stored as a
+    separate section of the same manifest file, so that the scripts can be run
+    independently of one another.
+
+    :param path: ``str`` path to the manifest file.
+
+    :param stage: ``str`` name of the build stage the records are for.
+
+    :param settings: ``dict`` of the settings the stage was run with. If these do
+        not match the settings stored in the manifest, all records are discarded.
+    """
+    def __init__(self, path, stage, settings=None):
+        self.path = path
+        self.stage = stage
+        self.settings = settings or {}
+        self.files = {}
+        self._pending = {}
+        self.load()
+
+    def load(self):
+        """Reads the records for the stage from disk, if they are still valid."""
+        self.files = {}
+        data = load_json(self.path, 'manifest')
+        if not data or data.get('version') != MANIFEST_VERSION:
+            return
+        section = data.get('stages', {}).get(self.stage)
+        if not section or section.get('settings') != self.settings:
+            return
+        self.files = section.get('files', {})
+
+    def save(self):
+        """Writes the records for the stage to disk, preserving other stages."""
+        data = load_json(self.path) or {}
+        if data.get('version') != MANIFEST_VERSION:
+            data = {'version': MANIFEST_VERSION, 'stages': {}}
+        data['stages'][self.stage] = {'settings': self.settings, 'files': self.files}
+        save_json(self.path, data)
+
+    def clear(self):
+        """Discards all records, forcing a full rebuild."""
+        self.files = {}
+        self._pending = {}
+
+    def diff(self, docs_sources, filenames, stats=None):
+        """
+        Compares the files given against the records in the manifest.
+
+        Files whose size and modification time match their record are assumed
+        to be unchanged; otherwise their contents are hashed to check if they
+        have actually changed.
+
+        :param docs_sources: ``str`` path to the directory containing the files.
+
+        :param filenames: ``list`` of the names of the files in ``docs_sources``.
+            Directories are ignored.
+
+        :param stats: ``dict`` mapping the name of each file to its size and
+            modification time, e.g. :attr:`catalogue.Catalogue.stats`, so that
+            the files do not have to be stat'ed again.
+
+        :return: ``tuple`` of the ``list`` of new or changed files and the
+            ``list`` of files that have been removed since the last build.
+        """
+        changed = []
+        current = set()
+        for f in filenames:
+            if stats is not None:
+                size, mtime = stats[f]
+            else:
+                stat = os.stat(os.path.join(docs_sources, f))
+                if not S_ISREG(stat.st_mode):
+                    continue
+                size, mtime = stat.st_size, stat.st_mtime
+            current.add(f)
+            record = self.files.get(f)
+            if record and record['size'] == size and record['mtime'] == mtime:
+                continue
+            digest = hash_file(os.path.join(docs_sources, f))
+            if record and record['size'] == size and record['hash'] == digest:
+                # NOTE: The file was only touched, so just refresh its timestamp.
+                record['mtime'] = mtime
+                continue
+            self._pending[f] = {'size': size, 'mtime': mtime, 'hash': digest}
+            changed.append(f)
+        removed = [f for f in self.files if f not in current]
+        return changed, removed
+
+    def get(self, filename, key, default=None):
+        """Returns the value stored for ``key`` in the record of the file given."""
+        return self.files.get(filename, {}).get(key, default)
+
+    def get_hash(self, filename):
+        """
+        Returns the content hash of the file given, as computed by the last
+        :meth:`diff`, or as recorded by the last build if it has not changed.
+        """
+        return (self._pending.get(filename) or self.files.get(filename, {})).get('hash')
+
+    def commit(self, filename, **kwargs):
+        """
+        Records the file given as processed. Any additional keyword arguments
+        are stored along with the record.
+        """
+        record = self._pending.pop(filename, None) or dict(self.files.get(filename, {}))
+        record.update(kwargs)
+        self.files[filename] = record
+
+    def remove(self, filename):
+        """Removes the record for the file given."""
+        self._pending.pop(filename, None)
+        return self.files.pop(filename, None)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+This module contains the instrumentation of the build. Each page records the
+time spent in each stage of its processing, and the build collects them into
+a JSON metrics file and an end-of-run summary.
+"""
+import logging
+import time
+from lib import get_sidecar_path, save_json
+
+
+# NOTE: The stages of processing a page, in order. The streaming engine does
+# not build a tree, so its parsing is counted as part of ``rewrite``.
+STAGES = ('read', 'parse', 'rewrite', 'extract', 'serialise', 'optimise', 'write', 'insert')
+METRICS_NAME = '.{0}Metrics.json'
+
+
+def get_metrics_path(output_path, stage):
+    """
+    Returns the default path to the metrics file of the build stage given, for
+    the given output (either the ``Documents`` directory or the database file).
+    """
+    return get_sidecar_path(output_path, METRICS_NAME.format(stage))
+
+
+def percentile(values, pct):
+    """Returns the ``pct`` percentile of the sorted ``list`` of values given."""
+    if not values:
+        return 0.0
+    idx = min(len(values) - 1, max(0, int(round(pct / 100.0 * (len(values) - 1)))))
+    return values[idx]
+
+
+class Stopwatch(object):
+    """
+    This class accumulates the time spent in each stage of processing a page
+    into the ``dict`` given.
+    """
+    def __init__(self, stages=None):
+        self.stages = stages if stages is not None else {}
+        self.last = time.time()
+
+    def lap(self, stage):
+        """Adds the time elapsed since the last lap to the stage given."""
+        now = time.time()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self.last
+        self.last = now
+
+
+class BuildMetrics(object):
+    """
+    This class collects the metrics of every page processed during a build.
+
+    :param jobs: ``int`` number of worker processes used by the build.
+    """
+    def __init__(self, jobs=1):
+        self.jobs = jobs
+        self.pages = {}
+        self.start = time.time()
+        self.end = None
+
+    def add_page(self, filename, page_metrics):
+        """Records the metrics of a single page."""
+        self.pages[filename] = page_metrics
+
+    def finish(self):
+        """Marks the end of the build."""
+        self.end = time.time()
+
+    def summary(self, top=10):
+        """
+        Returns the summary of the build.
+
+        :param top: ``int`` number of the slowest and largest pages to report.
+
+        :return: ``dict`` of the totals per stage, the percentiles of the time
+            taken per page, the totals per worker and the ``top`` slowest and
+            largest pages.
+        """
+        wall_time = (self.end or time.time()) - self.start
+        totals = dict((stage, 0.0) for stage in STAGES)
+        workers = {}
+        for metrics in self.pages.values():
+            for stage in STAGES:
+                totals[stage] += metrics.get(stage, 0.0)
+            worker = workers.setdefault(str(metrics.get('pid')), {'pages': 0, 'busy': 0.0, 'bytes': 0})
+            worker['pages'] += 1
+            worker['busy'] += metrics.get('total', 0.0)
+            worker['bytes'] += metrics.get('bytes', 0)
+        page_times = sorted(m.get('total', 0.0) for m in self.pages.values())
+        by_time = sorted(self.pages.items(), key=lambda p: p[1].get('total', 0.0), reverse=True)
+        by_size = sorted(self.pages.items(), key=lambda p: p[1].get('bytes', 0), reverse=True)
+        return {
+            'wallTime': wall_time,
+            'jobs': self.jobs,
+            'pages': len(self.pages),
+            'entries': sum(m.get('entries', 0) for m in self.pages.values()),
+            'bytes': sum(m.get('bytes', 0) for m in self.pages.values()),
+            'formattedBytes': sum(m.get('formattedBytes', 0) for m in self.pages.values()),
+            'bytesSaved': sum(m.get('bytesSaved', 0) for m in self.pages.values()),
+            'stages': totals,
+            'pageTime': {'p50': percentile(page_times, 50),
+                         'p90': percentile(page_times, 90),
+                         'p99': percentile(page_times, 99),
+                         'max': page_times[-1] if page_times else 0.0},
+            'workers': workers,
+            'slowest': [dict(m, page=f) for f, m in by_time[:top]],
+            'largest': [dict(m, page=f) for f, m in by_size[:top]],
+        }
+
+    def write(self, metrics_path, top=10):
+        """Writes the summary and the metrics of every page to a JSON file."""
+        data = self.summary(top)
+        data['perPage'] = self.pages
+        save_json(metrics_path, data, indent=1)
+
+    def log_summary(self, logger=None, top=10):
+        """Logs the summary of the build."""
+        logger = logger or logging.getLogger(__name__)
+        summary = self.summary(top)
+        logger.info('Processed {0} pages ({1:.1f} MB) in {2:.2f}s with {3} jobs.'.format(
+            summary['pages'], summary['bytes'] / 1048576.0, summary['wallTime'], summary['jobs']))
+        if not summary['pages']:
+            return
+        if summary['formattedBytes']:
+            logger.info('Optimised pages: saved {0:.1f} MB of {1:.1f} MB ({2:.1f}%).'.format(
+                summary['bytesSaved'] / 1048576.0, summary['formattedBytes'] / 1048576.0,
+                100.0 * summary['bytesSaved'] / summary['formattedBytes']))
+        logger.info('Time per stage: {0}'.format(', '.join(
+            ['{0} {1:.2f}s'.format(stage, summary['stages'][stage]) for stage in STAGES])))
+        logger.info('Time per page: p50 {p50:.4f}s, p90 {p90:.4f}s, p99 {p99:.4f}s, max {max:.4f}s'.format(
+            **summary['pageTime']))
+        logger.info('Time per worker: {0}'.format(', '.join(
+            ['{0}: {1} pages in {2:.2f}s'.format(pid, w['pages'], w['busy'])
+             for pid, w in sorted(summary['workers'].items())])))
+        logger.info('Slowest pages:\n{0}'.format('\n'.join(
+            ['    {0:.4f}s {1} ({2} bytes)'.format(m.get('total', 0.0), m['page'], m.get('bytes', 0))
+             for m in summary['slowest']])))
+        logger.info('Largest pages:\n{0}'.format('\n'.join(
+            ['    {0} bytes {1} ({2:.4f}s)'.format(m.get('bytes', 0), m['page'], m.get('total', 0.0))
+             for m in summary['largest']])))
@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+"""
+This module builds the optional search tables of the docset database, and is a
+command-line utility to query and benchmark them. Dash only reads the
+``searchIndex`` table; these tables are for our own tooling, such as editor
+plugins and documentation checks in CI.
+
+Two kinds of lookup are supported:
+
+* prefix lookups of the qualified names of the entries, e.g. ``Anim::Sp``, on
+  a case-insensitive index of the ``searchIndex`` table;
+* full-text lookups of any part of the names and brief descriptions of the
+  entries, on an FTS5 table that uses the ``trigram`` tokenizer where SQLite
+  supports it.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import time
+from doxygen import get_member_briefs
+from lib import get_database_path
+from metrics import percentile
+
+
+SEARCH_TEXT_TABLE = 'searchText'
+NAME_INDEX = 'searchIndexName'
+# NOTE: The ``trigram`` tokenizer, which matches any substring of at least 3
+# characters, is available from SQLite 3.34. Older versions match word prefixes.
+TRIGRAM_VERSION = (3, 34, 0)
+MIN_TRIGRAM_LENGTH = 3
+# NOTE: Matches in the name of an entry rank well above matches in its brief.
+RANK = 'bm25(searchText, 10.0, 1.0)'
+# NOTE: Sorts after every other character, so that ``name < prefix + PREFIX_END``
+# bounds the names that start with ``prefix``.
+PREFIX_END = '\U0010ffff'
+
+
+def get_tokenizer():
+    """Returns the FTS5 tokenizer used for the full-text table."""
+    return 'trigram' if sqlite3.sqlite_version_info >= TRIGRAM_VERSION else 'unicode61'
+
+
+def has_search_text(database_file_path):
+    """Returns ``True`` if the database given already contains the full-text table."""
+    if not os.path.isfile(database_file_path):
+        return False
+    conn = sqlite3.connect(database_file_path)
+    try:
+        return conn.execute('SELECT name FROM sqlite_master WHERE type = \'table\' AND name = ?;',
+                            (SEARCH_TEXT_TABLE,)).fetchone() is not None
+    finally:
+        conn.close()
+
+
+def get_page_name(path):
+    """Returns the name of the page the path of an entry points to."""
+    page = path.split('#', 1)[0]
+    return page[2:] if page.startswith('./') else page
+
+
+def build_search_tables(database_file_path, docs_sources):
+    """
+    Builds the prefix index and the full-text table of the search index of the
+    database given, from scratch. The brief description of each member is read
+    from the page of its class.
+
+    :param database_file_path: ``str`` path to the docset database. Its search
+        index must already be written.
+
+    :param docs_sources: ``str`` path to the directory of the pages, either
+        formatted or not.
+
+    :return: ``int`` number of entries in the full-text table.
+    """
+    logger = logging.getLogger(__name__)
+    start = time.time()
+    conn = sqlite3.connect(database_file_path, isolation_level=None)
+    try:
+        cur = conn.cursor()
+        cur.execute('BEGIN;')
+        cur.execute('CREATE INDEX IF NOT EXISTS {0} ON searchIndex (name COLLATE NOCASE);'.format(NAME_INDEX))
+        cur.execute('DROP TABLE IF EXISTS {0};'.format(SEARCH_TEXT_TABLE))
+        try:
+            cur.execute('CREATE VIRTUAL TABLE {0} USING fts5(name, brief, type UNINDEXED, path UNINDEXED, '
+                        'tokenize = \'{1}\');'.format(SEARCH_TEXT_TABLE, get_tokenizer()))
+        except sqlite3.OperationalError as e:
+            # NOTE: SQLite may be built without FTS5, in which case only the prefix
+            # index is available.
+            logger.warning('Could not create the full-text table, only prefix lookups are available: {0}'.format(e))
+            cur.execute('COMMIT;')
+            return 0
+
+        rows = []
+        briefs = {}
+        # NOTE: Sorted by path, so that each page is read once and only while its
+        # members are being added.
+        for name, entry_type, path in cur.execute('SELECT name, type, path FROM searchIndex ORDER BY path;').fetchall():
+            brief = ''
+            if '#' in path:
+                page = get_page_name(path)
+                if page not in briefs:
+                    page_path = os.path.join(docs_sources, page)
+                    briefs = {page: get_member_briefs(open(page_path).read()) if os.path.isfile(page_path) else {}}
+                brief = briefs[page].get(path.split('#', 1)[1], '')
+            rows.append((name, brief, entry_type, path))
+        cur.executemany('INSERT INTO {0}(name, brief, type, path) VALUES (?, ?, ?, ?);'.format(SEARCH_TEXT_TABLE), rows)
+        cur.execute('INSERT INTO {0}({0}) VALUES (\'optimize\');'.format(SEARCH_TEXT_TABLE))
+        cur.execute('COMMIT;')
+    finally:
+        conn.close()
+    logger.info('Built the search tables of {0} entries in {1:.2f}s.'.format(len(rows), time.time() - start))
+    return len(rows)
+
+
+def drop_search_tables(database_file_path):
+    """Removes the prefix index and the full-text table from the database given, if it has them."""
+    conn = sqlite3.connect(database_file_path)
+    try:
+        conn.execute('DROP INDEX IF EXISTS {0};'.format(NAME_INDEX))
+        conn.execute('DROP TABLE IF EXISTS {0};'.format(SEARCH_TEXT_TABLE))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class SearchIndex(object):
+    """
+    This class looks up entries in the search tables of a docset database. The
+    database is opened read-only.
+
+    :param database_file_path: ``str`` path to the docset database.
+    """
+    def __init__(self, database_file_path):
+        if not os.path.isfile(database_file_path):
+            raise IOError('The database: {0} does not exist!'.format(database_file_path))
+        self.database_file_path = database_file_path
+        self.logger = logging.getLogger(__name__)
+        self.conn = sqlite3.connect('file:{0}?mode=ro'.format(os.path.abspath(database_file_path)), uri=True)
+        row = self.conn.execute('SELECT sql FROM sqlite_master WHERE type = \'table\' AND name = ?;',
+                                (SEARCH_TEXT_TABLE,)).fetchone()
+        self.has_text = row is not None
+        self.trigram = self.has_text and 'trigram' in row[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def prefix(self, query, limit=20):
+        """
+        Returns the entries whose qualified name starts with the query given,
+        ignoring case, in alphabetical order.
+
+        :return: ``list`` of ``(name, type, path)`` tuples.
+        """
+        if not query:
+            return []
+        return self.conn.execute('SELECT name, type, path FROM searchIndex '
+                                 'WHERE name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE '
+                                 'ORDER BY name COLLATE NOCASE LIMIT ?;',
+                                 (query, query + PREFIX_END, limit)).fetchall()
+
+    def get_match_expression(self, query):
+        """Returns the FTS5 query that matches the text given."""
+        if self.trigram:
+            return '"{0}"'.format(query.replace('"', '""'))
+        return ' '.join('"{0}"*'.format(word.replace('"', '""')) for word in query.split())
+
+    def search(self, query, limit=20):
+        """
+        Returns the entries whose name or brief description contains the text
+        given, ignoring case, from the best match to the worst.
+
+        Queries shorter than the trigrams of the full-text table are looked up
+        as prefixes instead. Without a full-text table, the names are scanned.
+
+        :return: ``list`` of ``(name, type, path, brief)`` tuples.
+        """
+        query = query.strip()
+        if not query:
+            return []
+        if self.has_text and (len(query) >= MIN_TRIGRAM_LENGTH or not self.trigram):
+            return self.conn.execute('SELECT name, type, path, brief FROM {0} WHERE {0} MATCH ? '
+                                     'ORDER BY {1} LIMIT ?;'.format(SEARCH_TEXT_TABLE, RANK),
+                                     (self.get_match_expression(query), limit)).fetchall()
+        if self.has_text:
+            return [entry + ('',) for entry in self.prefix(query, limit)]
+        self.logger.debug('The database has no full-text table, scanning the names instead.')
+        pattern = '%{0}%'.format(query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+        return self.conn.execute('SELECT name, type, path, \'\' FROM searchIndex WHERE name LIKE ? ESCAPE \'\\\' '
+                                 'ORDER BY name LIMIT ?;', (pattern, limit)).fetchall()
+
+
+def get_time_stats(times):
+    """Returns the percentiles of the lookup times given, in milliseconds."""
+    times = sorted(t * 1000.0 for t in times)
+    return {'p50Ms': round(percentile(times, 50), 4),
+            'p90Ms': round(percentile(times, 90), 4),
+            'p99Ms': round(percentile(times, 99), 4),
+            'maxMs': round(times[-1], 4) if times else 0.0}
+
+
+def benchmark_lookups(database_file_path, num_queries=1000, limit=20, seed=0):
+    """
+    Measures the latency of prefix and full-text lookups on the database given.
+    The queries are sampled from the names in its search index: prefixes of the
+    qualified names, and parts of the member names.
+
+    :param num_queries: ``int`` number of queries of each kind.
+
+    :param limit: ``int`` maximum number of results of each query.
+
+    :param seed: ``int`` seed of the sampling of the queries, so that runs are comparable.
+
+    :return: ``dict`` of the percentiles of the latency of each kind of lookup.
+    """
+    rng = random.Random(seed)
+    with SearchIndex(database_file_path) as index:
+        names = [row[0] for row in index.conn.execute('SELECT name FROM searchIndex;')]
+        if not names:
+            raise IOError('The database: {0} has no entries to look up!'.format(database_file_path))
+        results = {'entries': len(names), 'queries': num_queries, 'fullText': index.has_text, 'trigram': index.trigram}
+        for kind, lookup in (('prefix', index.prefix), ('text', index.search)):
+            times = []
+            num_results = 0
+            for _ in range(num_queries):
+                name = rng.choice(names)
+                if kind == 'prefix':
+                    query = name[:rng.randint(1, len(name))]
+                else:
+                    member = name.rsplit('::', 1)[-1]
+                    start = rng.randint(0, max(0, len(member) - MIN_TRIGRAM_LENGTH))
+                    query = member[start:start + rng.randint(MIN_TRIGRAM_LENGTH, 8)]
+                start_time = time.perf_counter()
+                num_results += len(lookup(query, limit))
+                times.append(time.perf_counter() - start_time)
+            results[kind] = get_time_stats(times)
+            results[kind]['meanResults'] = round(num_results / float(num_queries), 2)
+    return results
+
+
+def main(query, database_file_path=None, max_version='2017', mode='text', limit=20):
+    """
+    This is the main entry point of the program. It prints the entries that
+    match the query given, one per line, as tab-separated fields.
+
+    :param query: ``str`` text to look up.
+
+    :param mode: ``str`` either ``prefix`` or ``text``.
+
+    :return: ``int`` exit code; non-zero if nothing matched.
+    """
+    with SearchIndex(database_file_path or get_database_path(max_version)) as index:
+        results = index.prefix(query, limit) if mode == 'prefix' else index.search(query, limit)
+    for result in results:
+        print('\t'.join(result))
+    return 0 if results else 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='This program looks up entries in the search tables of the docset database.')
+    parser.add_argument('query',
+                        nargs='?',
+                        help='The text to look up.')
+    parser.add_argument('-db',
+                        '--database',
+                        type=str,
+                        help='The full path to the docset database.')
+    parser.add_argument('-mv',
+                        '--maxVersion',
+                        default='2017',
+                        help='The 3ds max version of the docset, used to find its database if not given.')
+    parser.add_argument('-p',
+                        '--prefix',
+                        action='store_true',
+                        help='If set, looks up the entries whose qualified name starts with the query, instead of any part of their name or description.')
+    parser.add_argument('-l',
+                        '--limit',
+                        type=int,
+                        default=20,
+                        help='The maximum number of entries to print.')
+    parser.add_argument('-b',
+                        '--build',
+                        type=str,
+                        metavar='DOCUMENTS',
+                        help='Builds the search tables of the database from the pages in the directory given, instead of looking up the query.')
+    parser.add_argument('-bm',
+                        '--benchmark',
+                        type=int,
+                        metavar='QUERIES',
+                        help='Measures the latency of the given number of sampled lookups of each kind, instead of looking up the query, and prints it as JSON.')
+    parser.add_argument('-v',
+                        '--verbose',
+                        action='store_true',
+                        help='If set, logs debugging information.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    database = args.database or get_database_path(args.maxVersion)
+    if args.build:
+        build_search_tables(database, args.build)
+        sys.exit(0)
+    if args.benchmark:
+        print(json.dumps(benchmark_lookups(database, args.benchmark, args.limit), indent=2))
+        sys.exit(0)
+    if not args.query:
+        parser.error('A query is required, unless building or benchmarking the search tables.')
+    sys.exit(main(args.query, database, args.maxVersion, 'prefix' if args.prefix else 'text', args.limit))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+This module contains the content-addressed store that is shared by the docsets
+of several versions of 3ds max. Consecutive releases of the documentation share
+most of their pages and nearly all of their assets, so every file of each
+docset is stored once under its content hash, and hard linked into each docset
+that contains it.
+"""
+import errno
+import logging
+import os
+from lib import load_json, save_json
+from manifest import hash_file
+
+
+STORE_NAME = '.docsetStore'
+STORE_INDEX_NAME = 'index.json'
+
+
+class ContentStore(object):
+    """
+    This class hard links identical files of several directories to a single
+    copy of each, stored under its SHA-1 hash.
+
+    The store keeps an index of the size, modification time, inode and hash of
+    every file it has linked, so that only files that have changed since are
+    hashed again. For the files mirrored from a source, such as the assets, it
+    also records the size and modification time of the source, so that a linked
+    file can be checked against its source without reading either of them.
+
+    :param path: ``str`` path to the directory of the store. It must be on the
+        same filesystem as the directories linked to it.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self._sources = {}
+        self.logger = logging.getLogger(__name__)
+        self.load()
+
+    def load(self):
+        """Reads the index of the store from disk."""
+        self.files = load_json(os.path.join(self.path, STORE_INDEX_NAME), 'store index') or {}
+
+    def save(self):
+        """Writes the index of the store to disk."""
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        save_json(os.path.join(self.path, STORE_INDEX_NAME), self.files)
+
+    def get_object_path(self, digest):
+        """Returns the path of the stored copy of the file with the hash given."""
+        return os.path.join(self.path, digest[:2], digest)
+
+    def set_source(self, file_path, source_path):
+        """
+        Records that the file given is a copy of the source given, which is
+        added to its record the next time the file is linked.
+        """
+        source_stat = os.stat(source_path)
+        self._sources[os.path.abspath(file_path)] = [source_stat.st_size, source_stat.st_mtime_ns]
+
+    def is_linked_copy(self, file_path, source_path):
+        """
+        Returns ``True`` if the file given is still linked to the store and its
+        source has not changed since it was recorded by :meth:`set_source`.
+        """
+        record = self.files.get(os.path.abspath(file_path))
+        if not record or len(record) < 5:
+            return False
+        stat = os.stat(file_path)
+        source_stat = os.stat(source_path)
+        return record[:3] == [stat.st_size, stat.st_mtime_ns, stat.st_ino] and \
+            record[4] == [source_stat.st_size, source_stat.st_mtime_ns]
+
+    def link_file(self, file_path):
+        """
+        Replaces the file given with a hard link to its stored copy, adding it
+        to the store first if needed.
+
+        :return: ``str`` either ``linked`` if the file was replaced with a link,
+            ``stored`` if it was added to the store, or ``unchanged`` if it was
+            already linked.
+        """
+        stat = os.stat(file_path)
+        key = os.path.abspath(file_path)
+        record = self.files.get(key)
+        source = self._sources.pop(key, None)
+        if record and record[:3] == [stat.st_size, stat.st_mtime_ns, stat.st_ino]:
+            if source is not None:
+                self.files[key] = record[:4] + [source]
+            return 'unchanged'
+        digest = hash_file(file_path)
+        object_path = self.get_object_path(digest)
+        try:
+            object_stat = os.stat(object_path)
+        except OSError:
+            object_stat = None
+        if object_stat is None:
+            if not os.path.isdir(os.path.dirname(object_path)):
+                os.makedirs(os.path.dirname(object_path))
+            os.link(file_path, object_path)
+            result = 'stored'
+        elif object_stat.st_ino == stat.st_ino:
+            result = 'unchanged'
+        else:
+            # NOTE: Link to a temporary name first, so that the file is never missing.
+            temp_path = file_path + '.tmp'
+            os.link(object_path, temp_path)
+            os.replace(temp_path, file_path)
+            stat = os.stat(file_path)
+            result = 'linked'
+        self.files[key] = [stat.st_size, stat.st_mtime_ns, stat.st_ino, digest] + ([source] if source else [])
+        return result
+
+    def link_tree(self, root):
+        """
+        Replaces every file in the directory given with a hard link to its
+        stored copy.
+
+        :return: ``dict`` of the number of files linked to an existing copy,
+            added to the store or already linked, and the number of bytes saved.
+        """
+        stats = {'linked': 0, 'stored': 0, 'unchanged': 0, 'bytesSaved': 0}
+        for directory, _, filenames in os.walk(root):
+            for f in filenames:
+                file_path = os.path.join(directory, f)
+                try:
+                    result = self.link_file(file_path)
+                except OSError as e:
+                    if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                        raise
+                    self.logger.warning('Could not link: {0} to the store: {1}'.format(file_path, e))
+                    continue
+                stats[result] += 1
+                if result == 'linked':
+                    stats['bytesSaved'] += os.path.getsize(file_path)
+        return stats
+
+    def prune(self):
+        """
+        Removes the stored copies that are no longer linked to from any docset,
+        and the records of the files that no longer exist.
+
+        :return: ``int`` number of stored copies removed.
+        """
+        self.files = dict((key, record) for key, record in self.files.items() if os.path.isfile(key))
+        num_removed = 0
+        if not os.path.isdir(self.path):
+            return num_removed
+        for directory, _, filenames in os.walk(self.path):
+            for f in filenames:
+                if directory == self.path:
+                    continue
+                object_path = os.path.join(directory, f)
+                if os.stat(object_path).st_nlink <= 1:
+                    os.remove(object_path)
+                    num_removed += 1
+        return num_removed
@@ -0,0 +1,12 @@
+"""
+The tests of the scripts in ``bin``. Run them from the root of the repository
+with ``python -m unittest`` or ``python -m pytest tests``.
+"""
+import os
+import sys
+
+
+# NOTE: The scripts import each other as top-level modules.
+BIN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bin')
+if BIN_PATH not in sys.path:
+    sys.path.insert(0, BIN_PATH)
@@ -0,0 +1,52 @@
+"""
+Checks how the search index is written to the docset database.
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from database import DatabaseWriter, clean_database
+
+
+ENTRIES = [('Animatable', 'Class', 'class_animatable.html'),
+           ('Animatable::NumRefs', 'Method', 'class_animatable.html#a1')]
+
+
+class DatabaseWriterTest(unittest.TestCase):
+    """Checks :class:`database.DatabaseWriter`."""
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.database_file_path = os.path.join(self.path, 'docSet.dsidx')
+        clean_database(self.database_file_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def get_entries(self):
+        conn = sqlite3.connect(self.database_file_path)
+        try:
+            return conn.execute('SELECT name, type, path FROM searchIndex ORDER BY name;').fetchall()
+        finally:
+            conn.close()
+
+    def test_journal_mode(self):
+        # NOTE: Only a full rebuild trades durability for speed.
+        with DatabaseWriter(self.database_file_path, rebuild=True) as writer:
+            self.assertEqual(writer.conn.execute('PRAGMA journal_mode;').fetchone()[0], 'memory')
+        with DatabaseWriter(self.database_file_path) as writer:
+            self.assertEqual(writer.conn.execute('PRAGMA journal_mode;').fetchone()[0], 'delete')
+            self.assertEqual(writer.conn.execute('PRAGMA synchronous;').fetchone()[0], 2)
+
+    def test_update(self):
+        with DatabaseWriter(self.database_file_path, rebuild=True) as writer:
+            writer.insert(ENTRIES + ENTRIES)
+        self.assertEqual(self.get_entries(), ENTRIES)
+        with DatabaseWriter(self.database_file_path) as writer:
+            writer.delete(ENTRIES[1:])
+            writer.insert([ENTRIES[0], ('Animatable::GetRefs', 'Method', 'class_animatable.html#a2')])
+        self.assertEqual(self.get_entries(), [ENTRIES[0], ('Animatable::GetRefs', 'Method', 'class_animatable.html#a2')])
+
+
+if __name__ == '__main__':
+    unittest.main()
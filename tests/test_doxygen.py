@@ -0,0 +1,132 @@
+"""
+Checks how the names of the Doxygen pages are decoded and classified.
+"""
+import doctest
+import os
+import shutil
+import tempfile
+import unittest
+import catalogue
+import doxygen
+from catalogue import ASSET_KIND, PAGE_KIND, Catalogue, scan_catalogue
+from doxygen import ESCAPED_CHARACTERS, decode_name, get_page_entry
+
+
+# NOTE: The characters Doxygen escapes in the names of its pages, as listed in
+# ``escapeCharsInString`` of its ``util.cpp``.
+DOXYGEN_ESCAPES = [
+    (':', '_1'), ('/', '_2'), ('<', '_3'), ('>', '_4'), ('*', '_5'), ('&', '_6'), ('|', '_7'),
+    ('.', '_8'), ('!', '_9'), (',', '_00'), (' ', '_01'), ('{', '_02'), ('}', '_03'), ('?', '_04'),
+    ('^', '_05'), ('%', '_06'), ('(', '_07'), (')', '_08'), ('+', '_09'), ('=', '_0a'), ('$', '_0b'),
+    ('\\', '_0c'), ('@', '_0d'), (']', '_0e'), ('[', '_0f'), ('#', '_0g'),
+]
+
+# NOTE: The name of each page, and the search index entry expected for it.
+PAGE_ENTRIES = [
+    ('class_animatable.html', ('Animatable', 'Class')),
+    ('class_i_param_block2.html', ('IParamBlock2', 'Class')),
+    ('class_max_s_d_k_1_1_i_node.html', ('MaxSDK::INode', 'Class')),
+    ('class_max_s_d_k_1_1_graphics_1_1_render_item.html', ('MaxSDK::Graphics::RenderItem', 'Class')),
+    ('class_i_tab_3_01_t_01_4.html', ('ITab< T >', 'Class')),
+    ('class_i_param_block2___base.html', ('IParamBlock2_Base', 'Class')),
+    ('struct_my_struct.html', ('MyStruct', 'Struct')),
+    ('struct_my__struct.html', ('My_struct', 'Struct')),
+    ('struct_max_s_d_k_1_1_point3.html', ('MaxSDK::Point3', 'Struct')),
+    ('union_my_union.html', ('MyUnion', 'Union')),
+    ('namespace_max_s_d_k.html', ('MaxSDK', 'Namespace')),
+    ('namespacestd.html', ('std', 'Namespace')),
+    ('namespace_max_s_d_k_1_1_graphics.html', ('MaxSDK::Graphics', 'Namespace')),
+    ('mesh-example.html', ('MeshExample', 'Sample')),
+    ('simple_object-example.html', ('SimpleObjectExample', 'Sample')),
+    ('maxapi_8h.html', ('Maxapi', 'File')),
+    ('class__desc_8h.html', ('ClassDesc', 'File')),
+    ('class_8h.html', ('Class', 'File')),
+    ('struct__info_8h.html', ('StructInfo', 'File')),
+    ('union__foo_8h.html', ('UnionFoo', 'File')),
+    ('group___geom_module.html', ('Geom Module', 'Module')),
+    # NOTE: The pages below are not indexed.
+    ('class_animatable-members.html', None),
+    ('struct_my_struct-members.html', None),
+    ('namespaces.html', None),
+    ('namespacemembers.html', None),
+    ('namespacemembers_func.html', None),
+    ('namespacemembers_vars.html', None),
+    ('maxapi_8h_source.html', None),
+    ('classes.html', None),
+    ('annotated.html', None),
+    ('index.html', None),
+    ('img.png', None),
+]
+
+
+class DecodeNameTest(unittest.TestCase):
+    """Checks :func:`doxygen.decode_name` against the escapes of Doxygen."""
+    def test_escaped_characters(self):
+        self.assertEqual(dict((code[1:], c) for c, code in DOXYGEN_ESCAPES), ESCAPED_CHARACTERS)
+
+    def test_decode_escaped_characters(self):
+        for code, c in sorted(ESCAPED_CHARACTERS.items()):
+            self.assertEqual(decode_name('_a_{0}_b'.format(code)), 'A{0}B'.format(c), code)
+            self.assertEqual(decode_name('_a_{0}'.format(code)), 'A{0}'.format(c), code)
+
+    def test_decode_case_and_underscores(self):
+        self.assertEqual(decode_name('_i_node'), 'INode')
+        self.assertEqual(decode_name('std'), 'std')
+        self.assertEqual(decode_name('_my__struct'), 'My_struct')
+        self.assertEqual(decode_name('___base'), '_Base')
+        self.assertEqual(decode_name('_point3'), 'Point3')
+        self.assertEqual(decode_name('_max_s_d_k_1_1_i_tab_3_01_max_s_d_k_1_1_point3_01_5_01_4'),
+                         'MaxSDK::ITab< MaxSDK::Point3 * >')
+        self.assertEqual(decode_name('_operator_3_3'), 'Operator<<')
+
+    def test_doctests(self):
+        failures, _ = doctest.testmod(doxygen)
+        self.assertEqual(failures, 0)
+
+
+class PageEntryTest(unittest.TestCase):
+    """Checks :func:`doxygen.get_page_entry` for every kind of page."""
+    def test_page_entries(self):
+        for filename, expected in PAGE_ENTRIES:
+            entry = get_page_entry(filename)
+            self.assertEqual(entry, expected + (filename,) if expected else None, filename)
+
+
+class CatalogueTest(unittest.TestCase):
+    """Checks that the catalogue classifies the pages like :func:`doxygen.get_page_entry`."""
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.sources = os.path.join(self.path, 'cpp_ref')
+        os.makedirs(os.path.join(self.sources, 'subdirectory'))
+        for filename, _ in PAGE_ENTRIES:
+            with open(os.path.join(self.sources, filename), 'w') as f:
+                f.write(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_scan(self):
+        result = Catalogue.scan(self.sources)
+        self.assertEqual(sorted(result.pages), sorted(f for f, _ in PAGE_ENTRIES if f.endswith('.html')))
+        self.assertEqual(result.assets, ['img.png'])
+        for filename, expected in PAGE_ENTRIES:
+            self.assertEqual(result.get_page_entry(filename), expected + (filename,) if expected else None)
+            self.assertEqual(result.sizes[filename], len(filename))
+        self.assertEqual(result.files['index.html'][0], PAGE_KIND)
+        self.assertEqual(result.files['img.png'][0], ASSET_KIND)
+
+    def test_reuse(self):
+        catalogue_path = os.path.join(self.path, catalogue.CATALOGUE_NAME)
+        scan_catalogue(self.sources, catalogue_path)
+        self.assertEqual(Catalogue.load(catalogue_path, self.sources).files,
+                         Catalogue.scan(self.sources).files)
+        # NOTE: The names are not decoded again for the files already catalogued.
+        saved = Catalogue.load(catalogue_path, self.sources)
+        saved.files['class_animatable.html'][1] = 'Cached'
+        saved.save(catalogue_path)
+        result = scan_catalogue(self.sources, catalogue_path)
+        self.assertEqual(result.get_page_entry('class_animatable.html')[0], 'Cached')
+
+
+if __name__ == '__main__':
+    unittest.main()
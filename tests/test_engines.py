@@ -0,0 +1,179 @@
+"""
+Checks that the streaming engine and the BeautifulSoup engine produce the same
+links, Dash anchors and search index entries on the shapes of markup found in
+the Doxygen pages of the SDK reference.
+"""
+import logging
+import unittest
+from bs4 import BeautifulSoup
+from build_docset import format_soup, get_member_entries, get_member_records
+from compare_engines import compare_page, get_links
+from html_rewriter import PageRewriter
+
+
+HEADER = ('<html><head><link href="style/doxygen.css" rel="stylesheet"/>'
+          '<script src="../scripts/nav.js"></script></head><body>')
+FOOTER = '</body></html>'
+CLASS_NAME = 'Animatable'
+# NOTE: The links of the header of every page, and the anchor of each section.
+HEADER_LINKS = [('link', './doxygen.css'), ('script', './scripts/nav.js')]
+SECTION = ('a', None)
+
+
+def get_section(name, rows):
+    """Returns a ``memberdecls`` table of the section given, as Doxygen writes it."""
+    return ('<table class="memberdecls"><tr class="heading"><td colspan="2"><h2 class="groupheader">'
+            '<a name="{0}"></a>Section</h2></td></tr>\n{1}\n</table>\n'.format(name, rows))
+
+
+def get_row(item_right, row_class='memitem:a1', item_left='int '):
+    """Returns a row of a ``memberdecls`` table."""
+    return ('<tr class="{0}"><td class="memItemLeft" align="right" valign="top">{1}</td>'
+            '<td class="memItemRight" valign="bottom">{2}</td></tr>'.format(row_class, item_left, item_right))
+
+
+def get_memname(cell):
+    """Returns the ``memname`` table of a member's detailed documentation."""
+    return '<table class="memname"><tr><td class="memname">{0}</td></tr></table>\n'.format(cell)
+
+
+# NOTE: Each fixture is the body of a page, and the links, anchors and entries
+# expected of both engines once it has been formatted.
+FIXTURES = {
+    'nested_link': (
+        get_section('pub-methods', get_row('<b><a class="el" href="#!/url=./cpp_ref/class_animatable.html#a1">'
+                                           'Nested</a></b> ()')),
+        [SECTION, ('a', './class_animatable.html#a1')],
+        [],
+        [('Animatable::Nested', 'Method', 'class_animatable.html#a1')],
+    ),
+    'operator': (
+        get_section('pub-methods', get_row('<a class="el" href="#!/url=./cpp_ref/class_animatable.html#a2">'
+                                           'operator&lt;&lt;</a> (std::ostream &amp;os)',
+                                           item_left='std::ostream &amp; ')) +
+        get_memname('<a class="el" href="#!/url=./cpp_ref/class_ostream.html">std::ostream</a>&amp; '
+                    'Animatable::operator&lt;&lt; '),
+        [SECTION, ('a', './class_animatable.html#a2'), ('a', './class_ostream.html')],
+        ['//apple_ref/cpp/Function/Animatable::operator<<'],
+        [('Animatable::operator<<', 'Method', 'class_animatable.html#a2')],
+    ),
+    'enum_values': (
+        get_section('pub-types', get_row('<a class="el" href="#!/url=./cpp_ref/class_animatable.html#a3">Flags</a> { '
+                                         '<a class="el" href="#!/url=./cpp_ref/class_animatable.html#a3a">FLAG_A</a>, '
+                                         '<a class="el" href="#!/url=./cpp_ref/class_animatable.html#a3b">FLAG_B</a> }',
+                                         item_left='enum ')),
+        [SECTION, ('a', './class_animatable.html#a3'), ('a', './class_animatable.html#a3a'),
+         ('a', './class_animatable.html#a3b')],
+        [],
+        [('Animatable::Flags', 'Type', 'class_animatable.html#a3')],
+    ),
+    'inherited_row': (
+        get_section('pub-methods',
+                    get_row('<a class="el" href="#!/url=./cpp_ref/class_animatable.html#a4">Own</a> ()') +
+                    get_row('<a class="el" href="#!/url=./cpp_ref/class_base.html#a9">BaseMethod</a> ()',
+                            row_class='inherit pub_methods_class_base')) +
+        get_section('pro-methods',
+                    get_row('<a class="el" href="#!/url=./cpp_ref/class_base.html#a8">Protected</a> ()',
+                            row_class='inherit pro_methods_class_base')),
+        [SECTION, ('a', './class_animatable.html#a4'), ('a', './class_base.html#a9'),
+         SECTION, ('a', './class_base.html#a8')],
+        [],
+        [('Animatable::Own', 'Method', 'class_animatable.html#a4'),
+         ('Animatable::Protected', 'Method', 'class_base.html#a8')],
+    ),
+    'memname_ends_in_text': (
+        get_memname('virtual <a class="el" href="#!/url=./cpp_ref/class_ref.html">RefResult</a> '
+                    'Animatable::NotifyRefChanged '),
+        [('a', './class_ref.html')],
+        ['//apple_ref/cpp/Function/Animatable::NotifyRefChanged'],
+        [],
+    ),
+    'memname_ends_in_tag': (
+        get_memname('<a class="el" href="#!/url=./cpp_ref/class_ref.html">RefResult</a> '
+                    'Animatable::<b>NumRefs</b>'),
+        [('a', './class_ref.html')],
+        [],
+        [],
+    ),
+    'memname_ends_in_comment': (
+        get_memname('<a class="el" href="#!/url=./cpp_ref/class_ref.html">RefResult</a> '
+                    'Animatable::NumRefs <!-- overload 1 -->'),
+        [('a', './class_ref.html')],
+        ['//apple_ref/cpp/Function/Animatable::NumRefs'],
+        [],
+    ),
+    'memname_without_link': (
+        get_memname('int Animatable::Plain '),
+        [],
+        [],
+        [],
+    ),
+    'unquoted_and_escaped_links': (
+        '<a href=cpp_ref/class_i_node.html>INode</a><img src=cpp_ref/img.png>'
+        '<a href="#!/url=./cpp_ref/class_a.html#a1&amp;x=1">A</a>'
+        '<a href="cpp_ref/a&#46;html">B</a><a href=\'style/tabs.css\'>C</a>'
+        '<script src=\'../scripts/search.js\'></script>',
+        [('a', './class_i_node.html'), ('img', './img.png'), ('a', './class_a.html#a1&x=1'),
+         ('a', './a.html'), ('a', './tabs.css'), ('script', './scripts/search.js')],
+        [],
+        [],
+    ),
+}
+
+
+class EngineEquivalenceTest(unittest.TestCase):
+    """Formats each fixture with both engines and compares the results."""
+    def check_fixture(self, name):
+        body, links, anchors, entries = FIXTURES[name]
+        page = HEADER + body + FOOTER
+        differences, _, _ = compare_page(page, CLASS_NAME, logger=logging.getLogger(__name__))
+        self.assertEqual(differences, [])
+
+        # NOTE: Both engines agreeing is not enough; they must also be right.
+        soup = BeautifulSoup(page, 'html.parser')
+        records = get_member_records(soup)
+        self.assertEqual(get_member_entries(soup, CLASS_NAME), entries)
+        format_soup(soup, logging.getLogger(__name__))
+        self.assertEqual(get_links(str(soup)), (HEADER_LINKS + links, anchors))
+
+        rewriter = PageRewriter(CLASS_NAME).feed(page)
+        self.assertEqual(rewriter.records, records)
+        self.assertEqual(rewriter.entries, [(n, t, './' + p) for n, t, p in entries])
+
+    def test_nested_link(self):
+        self.check_fixture('nested_link')
+
+    def test_operator(self):
+        self.check_fixture('operator')
+
+    def test_enum_values(self):
+        self.check_fixture('enum_values')
+
+    def test_inherited_row(self):
+        self.check_fixture('inherited_row')
+
+    def test_memname_ends_in_text(self):
+        self.check_fixture('memname_ends_in_text')
+
+    def test_memname_ends_in_tag(self):
+        self.check_fixture('memname_ends_in_tag')
+
+    def test_memname_ends_in_comment(self):
+        self.check_fixture('memname_ends_in_comment')
+
+    def test_memname_without_link(self):
+        self.check_fixture('memname_without_link')
+
+    def test_unquoted_and_escaped_links(self):
+        self.check_fixture('unquoted_and_escaped_links')
+
+    def test_unformatted_page(self):
+        # NOTE: When only indexing, the page is left as it is.
+        page = HEADER + FIXTURES['operator'][0] + FOOTER
+        rewriter = PageRewriter(CLASS_NAME, rewrite=False).feed(page)
+        self.assertEqual(rewriter.getvalue(), page)
+        self.assertEqual(rewriter.entries, FIXTURES['operator'][3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+"""
+Checks how the jobs of a build are run by :mod:`lib`.
+"""
+import threading
+import unittest
+from lib import run_pipeline
+
+
+def process(filename, data):
+    """Returns the data read for the file, or a lock, which cannot be pickled."""
+    if filename == 'unpicklable':
+        return threading.Lock()
+    return data.upper()
+
+
+class RunPipelineTest(unittest.TestCase):
+    """Checks :func:`lib.run_pipeline`."""
+    def run_pipeline(self, filenames, jobs):
+        return dict((f, (result, error)) for f, result, error in run_pipeline(process, filenames, str, jobs=jobs))
+
+    def test_serial(self):
+        self.assertEqual(self.run_pipeline(['a', 'b'], 1), {'a': ('A', None), 'b': ('B', None)})
+
+    def test_workers(self):
+        self.assertEqual(self.run_pipeline(['a', 'b', 'c'], 2), {'a': ('A', None), 'b': ('B', None), 'c': ('C', None)})
+
+    def test_unpicklable_result(self):
+        # NOTE: The result cannot be sent back by the worker, which must fail the
+        # file rather than leave the pipeline waiting for it forever.
+        results = self.run_pipeline(['a', 'unpicklable', 'b'], 2)
+        self.assertEqual(results['a'], ('A', None))
+        self.assertEqual(results['b'], ('B', None))
+        result, error = results['unpicklable']
+        self.assertIsNone(result)
+        self.assertIn('MaybeEncodingError', error)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Checks how the assets of the docsets of several versions are linked to the
+shared store and mirrored again.
+"""
+import filecmp
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from assets import mirror_asset
+from store import ContentStore
+
+
+class LinkedAssetTest(unittest.TestCase):
+    """Checks that the assets linked to the store are skipped without being read."""
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.store = ContentStore(os.path.join(self.path, '.docsetStore'))
+        self.sources = []
+        self.destinations = []
+        for version, mtime in (('2017', 1000000000), ('2018', 1000000060)):
+            source_path = os.path.join(self.path, version + '.css')
+            with open(source_path, 'w') as f:
+                f.write('body {}')
+            os.utime(source_path, (mtime, mtime))
+            self.sources.append(source_path)
+            self.destinations.append(os.path.join(self.path, version, 'doxygen.css'))
+            os.makedirs(os.path.dirname(self.destinations[-1]))
+        self.mirror()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def mirror(self):
+        """Mirrors the asset of each version, and links it to the store."""
+        results = []
+        for source_path, destination_path in zip(self.sources, self.destinations):
+            results.append(mirror_asset(source_path, destination_path, store=self.store))
+            self.store.link_file(destination_path)
+        return results
+
+    def test_skip_linked(self):
+        self.assertEqual(os.stat(self.destinations[0]).st_ino, os.stat(self.destinations[1]).st_ino)
+        with mock.patch('filecmp.cmp', side_effect=AssertionError('The asset was read!')):
+            self.assertEqual(self.mirror(), ['skipped', 'skipped'])
+
+    def test_changed_source(self):
+        with open(self.sources[1], 'w') as f:
+            f.write('body { margin: 0 }')
+        self.assertEqual(self.mirror(), ['skipped', 'copy'])
+        self.assertTrue(filecmp.cmp(self.sources[1], self.destinations[1], shallow=False))
+        with open(self.destinations[0]) as f:
+            self.assertEqual(f.read(), 'body {}')
+
+
+if __name__ == '__main__':
+    unittest.main()